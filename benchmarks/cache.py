@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Benchmark of compiling expressions with a cache directory compared to parsing
+them with `ast.parse`.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function, division
+
+import argparse
+import ast
+import shutil
+import tempfile
+import timeit
+from memory import make_expressions
+import expression
+
+def compile_all(parser, expressions):
+    """
+    Compile each of the `expressions` using the expression `parser`.
+    """
+
+    for text in expressions:
+        parser.compile(text)
+
+def main():
+    """
+    Main entry point.
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmark cache directory')
+    parser.add_argument('--expressions', type=int, default=1000,
+                        help='Number of distinct expressions to compile')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of repetitions, of which the best is used')
+    args = parser.parse_args()
+
+    expressions = make_expressions(args.expressions)
+    cache_dir = tempfile.mkdtemp()
+    try:
+        cached_parser = expression.Expression_Parser(cache_dir=cache_dir)
+        compile_all(cached_parser, expressions)
+        methods = (
+            ('ast.parse', lambda: [ast.parse(text) for text in expressions]),
+            ('compile', lambda: compile_all(expression.Expression_Parser(),
+                                            expressions)),
+            ('disk', lambda: compile_all(
+                expression.Expression_Parser(cache_dir=cache_dir), expressions
+            )),
+            ('memory', lambda: compile_all(cached_parser, expressions))
+        )
+        for name, method in methods:
+            duration = min(timeit.Timer(method).repeat(args.repeat, 1))
+            print('{:9}: {:10.0f} expressions/s'.format(
+                name, args.expressions / duration
+            ))
+    finally:
+        shutil.rmtree(cache_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Benchmark of the throughput of the expression parser on inputs with a high
+rate of evaluation errors.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function, division
+
+import argparse
+import random
+import timeit
+import expression
+
+def make_records(count, error_rate, seed=0):
+    """
+    Create `count` variable scopes, where a fraction `error_rate` of them
+    lacks a variable or causes a division by zero.
+    """
+
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        record = {'amount': rng.randint(1, 1000), 'count': rng.randint(1, 10)}
+        if rng.random() < error_rate:
+            if rng.random() < 0.5:
+                del record['count']
+            else:
+                record['count'] = 0
+
+        records.append(record)
+
+    return records
+
+def run_raise(parser, tree, records):
+    """
+    Evaluate the records, catching raised `SyntaxError`s.
+    """
+
+    errors = 0
+    for record in records:
+        parser.variables = record
+        try:
+            parser.parse(tree)
+        except SyntaxError:
+            errors += 1
+
+    return errors
+
+def run_return(parser, tree, records):
+    """
+    Evaluate the records, counting returned `Expression_Error`s.
+    """
+
+    errors = 0
+    for record in records:
+        parser.variables = record
+        result = parser.parse(tree, raise_errors=False)
+        if isinstance(result, expression.Expression_Error):
+            errors += 1
+
+    return errors
+
+def main():
+    """
+    Main entry point.
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmark error throughput')
+    parser.add_argument('--records', type=int, default=20000,
+                        help='Number of records to evaluate')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of repetitions, of which the best is used')
+    args = parser.parse_args()
+
+    expression_parser = expression.Expression_Parser()
+    tree = expression_parser.compile('amount / count > 10 and amount < 900')
+    for error_rate in (0.0, 0.5, 0.9):
+        records = make_records(args.records, error_rate)
+        for name, method in (('raise', run_raise), ('return', run_return)):
+            timer = timeit.Timer(lambda method=method, records=records:
+                                 method(expression_parser, tree, records))
+            duration = min(timer.repeat(args.repeat, 1))
+            print('error rate {:.0%}, {:6}: {:10.0f} records/s'.format(
+                error_rate, name, args.records / duration
+            ))
+
+if __name__ == '__main__':
+    main()
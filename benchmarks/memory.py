@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Benchmark of the memory needed to keep many expressions in memory, either as
+syntax trees or as compact expressions.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function, division
+
+import argparse
+import ast
+import gc
+import random
+import tracemalloc
+import expression
+
+def make_expressions(count, seed=0):
+    """
+    Create `count` random filter expressions.
+    """
+
+    rng = random.Random(seed)
+    names = ['amount', 'country_code', 'count', 'price', 'discount', 'tax']
+    expressions = []
+    for _ in range(count):
+        terms = [
+            '{} {} {}'.format(rng.choice(names), rng.choice(['<', '>', '==']),
+                              rng.randint(0, 1000))
+            for _ in range(rng.randint(1, 4))
+        ]
+        expressions.append('{} * {} > {} and {}'.format(
+            rng.choice(names), rng.choice(names), rng.randint(0, 10000),
+            ' or '.join(terms)
+        ))
+
+    return expressions
+
+def measure(create, expressions):
+    """
+    Measure the memory in bytes that is allocated for keeping the results of
+    `create` for each of the `expressions`.
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    retained = [create(text) for text in expressions]
+    gc.collect()
+    end = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del retained
+    return end - start
+
+def main():
+    """
+    Main entry point.
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmark memory usage')
+    parser.add_argument('--expressions', type=int, default=10000,
+                        help='Number of expressions to keep in memory')
+    args = parser.parse_args()
+
+    expression_parser = expression.Expression_Parser()
+    expressions = make_expressions(args.expressions)
+    trees = measure(ast.parse, expressions)
+    table = expression.Compact_Table()
+    compact = measure(lambda text: expression.Compact_Expression(
+        expression_parser.compile(text), table
+    ), expressions)
+
+    for name, size in (('ast.parse', trees), ('compact', compact)):
+        print('{:9}: {:10d} bytes, {:7.1f} bytes per expression'.format(
+            name, size, size / args.expressions
+        ))
+
+if __name__ == '__main__':
+    main()
@@ -16,7 +16,20 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from .parser import Expression_Parser
+from .parser import Expression_Error, Expression_Parser
+from .canonical import Expression_Canonicalizer
+from .compact import Compact_Expression, Compact_Table
+from .intervals import Interval_Analyzer
+from .partial import Expression_Specializer
+from .program import Expression_Program
+from .results import Result_Cache
+from .rules import Rule_Index
+from .sql import SQL_Translator
 
-__all__ = ['Expression_Parser']
+__all__ = [
+    'Compact_Expression', 'Compact_Table', 'Expression_Canonicalizer',
+    'Expression_Error', 'Expression_Parser', 'Expression_Program',
+    'Expression_Specializer', 'Interval_Analyzer', 'Result_Cache',
+    'Rule_Index', 'SQL_Translator'
+]
 __version__ = '0.0.5'
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+"""
+Command line batch evaluator of expressions over files of records.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+from .parser import Expression_Error, Expression_Parser
+
+class Batch_Evaluator(object):
+    """
+    Evaluator of one or more named expressions for each record of a stream.
+
+    The `expressions` are a sequence of pairs of output names and expression
+    strings. Each expression is compiled once. The expressions are evaluated
+    in order, and later expressions can use the results of earlier ones.
+    """
+
+    def __init__(self, expressions, functions=None):
+        self._expressions = list(expressions)
+        self._parser = Expression_Parser(functions=functions)
+        self._trees = [
+            (name, self._parser.compile(text))
+            for name, text in self._expressions
+        ]
+
+    @property
+    def names(self):
+        """
+        Retrieve the output names of the expressions.
+        """
+
+        return [name for name, _ in self._expressions]
+
+    def evaluate(self, record):
+        """
+        Evaluate the expressions using the fields of the dictionary `record`
+        as variables.
+
+        Returns a tuple of the record updated with the results of the
+        expressions and an `Expression_Error`. If an expression fails, then
+        the error is provided and the remaining results are `None`. The
+        `record` may also be an `Expression_Error` from reading a malformed
+        record, which is returned with an empty record.
+        """
+
+        if isinstance(record, Expression_Error):
+            return self._fail({}, record)
+        if not isinstance(record, dict):
+            error = Expression_Error('TypeError', 'Record must be an object, not {}',
+                                     values=(record.__class__.__name__,))
+            return self._fail({}, error)
+
+        output = record.copy()
+        try:
+            self._parser.variables = record
+        except NameError as error:
+            return self._fail(output, Expression_Error.from_exception(error))
+
+        # Results are added to the scope without copying it again.
+        for name, tree in self._trees:
+            result = self._parser.parse(tree, raise_errors=False)
+            if isinstance(result, Expression_Error):
+                return self._fail(output, result)
+
+            output[name] = result
+            self._parser.update_variables({name: result})
+
+        return output, None
+
+    def _fail(self, output, error):
+        for name in self.names:
+            output.setdefault(name, None)
+
+        return output, error
+
+class JSON_Lines_Format(object):
+    """
+    Reader and writer of files with a JSON object on each line.
+    """
+
+    def __init__(self, names):
+        self._names = names
+
+    @staticmethod
+    def read(stream):
+        """
+        Generate records from the input `stream`. Lines that do not contain
+        valid JSON generate an `Expression_Error` instead of a record.
+        """
+
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield Expression_Error('ValueError', 'Invalid JSON: {}',
+                                       values=(error,))
+
+    def write(self, stream, records):
+        """
+        Write the `records` to the output `stream`.
+        """
+
+        # pylint: disable=no-self-use
+        stream.writelines(json.dumps(record, default=str) + '\n'
+                          for record in records)
+
+class CSV_Format(object):
+    """
+    Reader and writer of comma-separated values files with a header row.
+
+    Fields that contain integer or floating point numbers are converted to
+    numbers when reading. Rows with a different number of fields than the
+    header generate an `Expression_Error` instead of a record.
+    """
+
+    def __init__(self, names):
+        self._names = names
+        self._fields = None
+        self._writer = None
+
+    @staticmethod
+    def _convert(value):
+        if not isinstance(value, str):
+            return value
+
+        for convert in (int, float):
+            try:
+                return convert(value)
+            except ValueError:
+                pass
+
+        return value
+
+    def read(self, stream):
+        """
+        Generate records from the input `stream`.
+        """
+
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if self._fields is None:
+                self._fields = list(reader.fieldnames)
+
+            # Missing fields are `None` and extra fields are a list under the
+            # `None` key.
+            if None in row or None in row.values():
+                count = len([value for value in row.values() if value is not None])
+                count += len(row.get(None, [])) - (1 if None in row else 0)
+                yield Expression_Error('ValueError',
+                                       'Row has {} fields instead of {}',
+                                       values=(count, len(self._fields)))
+                continue
+
+            yield dict((key, self._convert(value)) for key, value in row.items())
+
+    def write(self, stream, records):
+        """
+        Write the `records` to the output `stream`.
+        """
+
+        if self._writer is None:
+            fields = list(self._fields or [])
+            fields.extend(name for name in self._names if name not in fields)
+            self._writer = csv.DictWriter(stream, fields, extrasaction='ignore')
+            self._writer.writeheader()
+
+        self._writer.writerows(records)
+
+FORMATS = {
+    'jsonl': JSON_Lines_Format,
+    'csv': CSV_Format
+}
+
+# Evaluator of a worker process
+_WORKER = {}
+
+def _start_worker(expressions):
+    _WORKER['evaluator'] = Batch_Evaluator(expressions)
+
+def _evaluate_worker(record):
+    return _WORKER['evaluator'].evaluate(record)
+
+def read_expressions(filename):
+    """
+    Read named expressions from a file with an assignment on each line, such
+    as `total = price * amount`. Empty lines and lines starting with a `#`
+    are ignored.
+    """
+
+    expressions = []
+    with open(filename) as definitions:
+        for line in definitions:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            name, separator, text = line.partition('=')
+            if not separator or not name.strip():
+                raise ValueError('Line must be an assignment: {}'.format(line))
+
+            expressions.append((name.strip(), text.strip()))
+
+    return expressions
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments.
+    """
+
+    description = 'Evaluate expressions for each record of a JSON lines or CSV file'
+    parser = argparse.ArgumentParser(description=description)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('expression', nargs='?', help='Expression to evaluate')
+    group.add_argument('--file', help='File with named expressions')
+    parser.add_argument('--name', default='result',
+                        help='Output field name of the expression')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='jsonl',
+                        help='Format of the input and output records')
+    parser.add_argument('--errors', choices=('skip', 'keep', 'stop'),
+                        default='skip',
+                        help='Skip, keep or stop at records with errors')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Number of processes to evaluate records with')
+    parser.add_argument('--chunk-size', dest='chunk_size', type=int,
+                        default=1000,
+                        help='Number of records to read and write at once')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not write a summary to standard error')
+    return parser.parse_args(argv)
+
+def run(args, stdin, stdout, stderr):
+    """
+    Evaluate the records from the `stdin` stream and write them to the
+    `stdout` stream using the parsed command line `args`. A summary is written
+    to the `stderr` stream. Returns the number of records with errors.
+    """
+
+    if args.file is not None:
+        expressions = read_expressions(args.file)
+    else:
+        expressions = [(args.name, args.expression)]
+
+    evaluator = Batch_Evaluator(expressions)
+    names = evaluator.names
+    if args.errors == 'keep':
+        names.append('error')
+
+    record_format = FORMATS[args.format](names)
+    records = record_format.read(stdin)
+
+    if args.jobs > 1:
+        pool = multiprocessing.Pool(args.jobs, _start_worker, (expressions,))
+        results = pool.imap(_evaluate_worker, records, args.chunk_size)
+    else:
+        pool = None
+        results = (evaluator.evaluate(record) for record in records)
+
+    start = time.time()
+    try:
+        count, errors = _write_results(args, record_format, results,
+                                       stdout, stderr)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    stdout.flush()
+    if not args.quiet:
+        _write_summary(stderr, count, time.time() - start, errors)
+
+    return sum(errors.values())
+
+def _write_results(args, record_format, results, stdout, stderr):
+    # Write the evaluated records in chunks and count the errors by kind.
+    count = 0
+    errors = {}
+    stopped = False
+    while not stopped:
+        results_chunk = list(itertools.islice(results, args.chunk_size))
+        if not results_chunk:
+            break
+
+        chunk = []
+        for output, error in results_chunk:
+            count += 1
+            if error is not None:
+                errors[error.kind] = errors.get(error.kind, 0) + 1
+                if args.errors == 'stop':
+                    stderr.write('Record {}: {}\n'.format(count,
+                                                          error.syntax_error().msg))
+                    stopped = True
+                    break
+                if args.errors == 'skip':
+                    continue
+                output['error'] = error.syntax_error().msg
+
+            chunk.append(output)
+
+        if chunk:
+            record_format.write(stdout, chunk)
+
+    return count, errors
+
+def _write_summary(stderr, count, duration, errors):
+    rate = count / duration if duration > 0 else float('inf')
+    stderr.write('{} records in {:.3f} seconds ({:.1f} records/s), {} errors\n'.format(
+        count, duration, rate, sum(errors.values())
+    ))
+    for kind, number in sorted(errors.items()):
+        stderr.write('  {}: {}\n'.format(kind, number))
+
+def main():
+    """
+    Main entry point.
+    """
+
+    args = parse_args()
+    errors = run(args, sys.stdin, sys.stdout, sys.stderr)
+    if errors and args.errors == 'stop':
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Persistent cache of compiled expression syntax trees.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import errno
+import hashlib
+import json
+import os
+import stat
+import tempfile
+
+class Expression_Cache(object):
+    """
+    On-disk cache of validated expression syntax trees, which can be shared
+    between multiple processes using the same cache directory.
+
+    Entries are written atomically by renaming a completed temporary file,
+    such that concurrent readers never see partial entries. Entries are only
+    read from disk when an expression is first requested by this process, and
+    the validated trees are kept in memory up to a maximum number of trees.
+
+    The entries store the fields of the syntax tree nodes as JSON, so reading
+    an entry never executes code. Decoding an entry is slower than parsing the
+    expression again, so the directory shares validated trees between
+    processes rather than saving parsing time. The directory is created such
+    that only the current user can access it, and a `ValueError` is raised if
+    an existing directory is owned by another user or writable by other users.
+    """
+
+    _suffix = '.json'
+
+    # Maximum number of trees to keep in memory
+    _max_trees = 1000
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._trees = {}
+
+        try:
+            os.makedirs(directory, 0o700)
+        except OSError as error:
+            if error.errno != errno.EEXIST or not os.path.isdir(directory):
+                raise
+
+        self._check_directory()
+
+    def _check_directory(self):
+        status = os.stat(self._directory)
+        if hasattr(os, 'getuid') and status.st_uid != os.getuid():
+            raise ValueError('Cache directory {} is owned by another user'.format(
+                self._directory
+            ))
+        if status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise ValueError('Cache directory {} is writable by other users'.format(
+                self._directory
+            ))
+
+    @property
+    def directory(self):
+        """
+        Retrieve the path to the cache directory.
+        """
+
+        return self._directory
+
+    @staticmethod
+    def key(expression, config):
+        """
+        Create a cache key for a string `expression` as parsed with a parser
+        configuration described by the string `config`.
+        """
+
+        digest = hashlib.sha256()
+        digest.update(config.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(expression.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + self._suffix)
+
+    @classmethod
+    def _encode(cls, value):
+        # Convert a syntax tree node or field value to JSON-compatible data.
+        # pylint: disable=protected-access
+        if isinstance(value, ast.AST):
+            fields = {}
+            for name in value._fields + value._attributes:
+                if hasattr(value, name):
+                    fields[name] = cls._encode(getattr(value, name))
+
+            return {'node': value.__class__.__name__, 'fields': fields}
+        if isinstance(value, list):
+            return [cls._encode(item) for item in value]
+        if isinstance(value, complex):
+            return {'complex': [value.real, value.imag]}
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+
+        raise ValueError('Cannot encode value of type {}'.format(
+            value.__class__.__name__
+        ))
+
+    @staticmethod
+    def _decode(data):
+        # Convert a JSON object to a syntax tree node or complex number. The
+        # objects are decoded innermost first, so field values are already
+        # converted. Only node types from the `ast` module are created.
+        if 'complex' in data:
+            return complex(*data['complex'])
+        if 'node' not in data:
+            return data
+
+        node_type = getattr(ast, data['node'], None)
+        if not isinstance(node_type, type) or not issubclass(node_type, ast.AST):
+            raise ValueError('Unknown node type {}'.format(data['node']))
+
+        node = node_type()
+        for name, value in data['fields'].items():
+            setattr(node, str(name), value)
+
+        return node
+
+    def _remember(self, key, tree):
+        if len(self._trees) >= self._max_trees:
+            self._trees.clear()
+
+        self._trees[key] = tree
+
+    def load(self, key, validate=None):
+        """
+        Retrieve the syntax tree stored under the cache `key`. If there is no
+        such entry or it is unreadable, then `None` is returned.
+
+        Trees that are read from the cache directory are passed to the
+        `validate` callable, if provided, before they are kept in memory.
+        Errors raised by `validate` are passed on. Trees that are already in
+        memory are returned without validating them again.
+        """
+
+        if key in self._trees:
+            return self._trees[key]
+
+        try:
+            with open(self._path(key), 'r') as entry:
+                tree = json.load(entry, object_hook=self._decode)
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
+
+        if not isinstance(tree, ast.Module):
+            return None
+
+        if validate is not None:
+            validate(tree)
+
+        self._remember(key, tree)
+        return tree
+
+    def store(self, key, tree):
+        """
+        Store the syntax tree `tree` under the cache `key`.
+
+        If the entry cannot be written, for example because the disk is full,
+        then the tree is only kept in the memory of this process.
+        """
+
+        self._remember(key, tree)
+
+        try:
+            data = json.dumps(self._encode(tree))
+        except ValueError:
+            return
+
+        try:
+            handle, temp_path = tempfile.mkstemp(suffix='.tmp',
+                                                 dir=self._directory)
+        except (IOError, OSError):
+            return
+
+        try:
+            with os.fdopen(handle, 'w') as entry:
+                entry.write(data)
+
+            os.rename(temp_path, self._path(key))
+        except (IOError, OSError):
+            os.remove(temp_path)
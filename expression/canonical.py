@@ -0,0 +1,292 @@
+"""
+Canonical forms and fingerprints of expression syntax trees.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import hashlib
+from .nodes import is_literal, literal_value
+from .parser import Expression_Error
+
+class Expression_Canonicalizer(ast.NodeVisitor):
+    """
+    Visitor that creates a canonical normalized form of a validated
+    expression syntax tree, as returned by `Expression_Parser.compile`.
+
+    The canonical form is an expression string without redundant whitespace
+    and parentheses, in which nested `and` and `or` operations are flattened
+    and keyword arguments are sorted. The form can be parsed again.
+
+    If `commutative` is enabled, then the operands of `+`, `*`, `&`, `|`, `^`,
+    `and`, `or`, `==` and `!=` are sorted and `>` and `>=` are rewritten to
+    `<` and `<=` when the operands contain no function calls. This assumes
+    that variables hold numbers or booleans and that only the truth value of
+    boolean operations matters. Otherwise, the operand order is kept.
+    """
+
+    # Binary operator symbols
+    _binary_symbols = {
+        ast.Add: '+',
+        ast.Sub: '-',
+        ast.Mult: '*',
+        ast.Div: '/',
+        ast.Mod: '%',
+        ast.Pow: '**',
+        ast.LShift: '<<',
+        ast.RShift: '>>',
+        ast.BitOr: '|',
+        ast.BitXor: '^',
+        ast.BitAnd: '&',
+        ast.FloorDiv: '//'
+    }
+
+    # Unary operator symbols
+    _unary_symbols = {
+        ast.Invert: '~',
+        ast.Not: 'not ',
+        ast.UAdd: '+',
+        ast.USub: '-'
+    }
+
+    # Comparison operator symbols
+    _compare_symbols = {
+        ast.Eq: '==',
+        ast.NotEq: '!=',
+        ast.Lt: '<',
+        ast.LtE: '<=',
+        ast.Gt: '>',
+        ast.GtE: '>=',
+        ast.Is: 'is',
+        ast.IsNot: 'is not',
+        ast.In: 'in',
+        ast.NotIn: 'not in'
+    }
+
+    # Boolean operator symbols
+    _boolean_symbols = {
+        ast.And: 'and',
+        ast.Or: 'or'
+    }
+
+    # Operators whose operands may be reordered
+    _commutative_ops = (ast.Add, ast.Mult, ast.BitOr, ast.BitXor, ast.BitAnd)
+    _symmetric_ops = (ast.Eq, ast.NotEq)
+    _mirrored_ops = {
+        ast.Gt: ast.Lt,
+        ast.GtE: ast.LtE
+    }
+
+    # Node types that are enclosed in parentheses when used as an operand
+    _compound_types = (ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.Compare,
+                       ast.IfExp)
+
+    def __init__(self, commutative=False):
+        self._commutative = commutative
+
+    def canonicalize(self, tree):
+        """
+        Create the canonical expression string of the syntax tree `tree`.
+        """
+
+        return self.visit(tree)
+
+    def fingerprint(self, tree):
+        """
+        Create a stable hexadecimal hash of the canonical form of the syntax
+        tree `tree`.
+        """
+
+        return hashlib.sha256(self.canonicalize(tree).encode('utf-8')).hexdigest()
+
+    def generic_visit(self, node):
+        raise Expression_Error('SyntaxError', 'Node {} not allowed', node,
+                               values=(node,))
+
+    @staticmethod
+    def _is_pure(node):
+        return not any(isinstance(child, ast.Call) for child in ast.walk(node))
+
+    def _operand(self, node):
+        text = self.visit(node)
+        if isinstance(node, self._compound_types):
+            return '({})'.format(text)
+        if is_literal(node) and text.startswith('-'):
+            return '({})'.format(text)
+
+        return text
+
+    def _flatten(self, node, node_type, op):
+        # Collect the operands of nested operations with the same operator.
+        if isinstance(node, node_type) and isinstance(node.op, op):
+            if node_type is ast.BoolOp:
+                children = node.values
+            else:
+                children = [node.left, node.right]
+
+            operands = []
+            for child in children:
+                operands.extend(self._flatten(child, node_type, op))
+
+            return operands
+
+        return [node]
+
+    def visit_Module(self, node):
+        """
+        Visit the root module node.
+        """
+
+        return '; '.join(self.visit(statement) for statement in node.body)
+
+    def visit_Expr(self, node):
+        """
+        Visit an expression node.
+        """
+
+        return self.visit(node.value)
+
+    def visit_BoolOp(self, node):
+        """
+        Visit a boolean expression node.
+        """
+
+        op = type(node.op)
+        operands = [
+            self._operand(value)
+            for value in self._flatten(node, ast.BoolOp, op)
+        ]
+        if self._commutative and self._is_pure(node):
+            operands.sort()
+
+        return ' {} '.format(self._boolean_symbols[op]).join(operands)
+
+    def visit_BinOp(self, node):
+        """
+        Visit a binary expression node.
+        """
+
+        op = type(node.op)
+        symbol = ' {} '.format(self._binary_symbols[op])
+        if self._commutative and op in self._commutative_ops and \
+                self._is_pure(node):
+            operands = sorted(
+                self._operand(operand)
+                for operand in self._flatten(node, ast.BinOp, op)
+            )
+            return symbol.join(operands)
+
+        return self._operand(node.left) + symbol + self._operand(node.right)
+
+    def visit_UnaryOp(self, node):
+        """
+        Visit a unary expression node.
+        """
+
+        return self._unary_symbols[type(node.op)] + self._operand(node.operand)
+
+    def visit_IfExp(self, node):
+        """
+        Visit an inline if..else expression node.
+        """
+
+        return '{} if {} else {}'.format(self._operand(node.body),
+                                         self._operand(node.test),
+                                         self._operand(node.orelse))
+
+    def visit_Compare(self, node):
+        """
+        Visit a comparison expression node.
+        """
+
+        left = self._operand(node.left)
+        if len(node.ops) == 1 and self._commutative and self._is_pure(node):
+            op = type(node.ops[0])
+            right = self._operand(node.comparators[0])
+            if op in self._symmetric_ops:
+                left, right = sorted((left, right))
+            elif op in self._mirrored_ops:
+                left, right = right, left
+                op = self._mirrored_ops[op]
+
+            return '{} {} {}'.format(left, self._compare_symbols[op], right)
+
+        parts = [left]
+        for operator, comparator in zip(node.ops, node.comparators):
+            parts.append(self._compare_symbols[type(operator)])
+            parts.append(self._operand(comparator))
+
+        return ' '.join(parts)
+
+    def visit_Call(self, node):
+        """
+        Visit a function call node.
+        """
+
+        arguments = [self.visit(arg) for arg in node.args]
+        arguments.extend(sorted(self.visit(keyword) for keyword in node.keywords))
+        return '{}({})'.format(self.visit(node.func), ', '.join(arguments))
+
+    def visit_Assign(self, node):
+        """
+        Visit an assignment node.
+        """
+
+        targets = [self.visit(target) for target in node.targets]
+        return ' = '.join(targets + [self.visit(node.value)])
+
+    def visit_AugAssign(self, node):
+        """
+        Visit an augmented assignment node.
+        """
+
+        return '{} {}= {}'.format(self.visit(node.target),
+                                  self._binary_symbols[type(node.op)],
+                                  self.visit(node.value))
+
+    def visit_keyword(self, node):
+        """
+        Visit a function keyword argument node.
+        """
+
+        return '{}={}'.format(node.arg, self.visit(node.value))
+
+    def visit_Name(self, node):
+        """
+        Visit a named variable node.
+        """
+
+        # pylint: disable=no-self-use
+        return node.id
+
+    def visit_Num(self, node):
+        """
+        Visit a literal number node.
+        """
+
+        # pylint: disable=no-self-use
+        return repr(literal_value(node))
+
+    visit_NameConstant = visit_Num
+
+    def visit_Constant(self, node):
+        """
+        Visit a constant node (Python 3.8 and later).
+        """
+
+        if not is_literal(node):
+            return self.generic_visit(node)
+
+        return repr(literal_value(node))
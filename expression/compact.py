@@ -0,0 +1,353 @@
+"""
+Compact storage of validated expression syntax trees.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from array import array
+import ast
+import threading
+from .nodes import is_literal, literal_value, make_literal, make_module
+from .parser import Expression_Error
+
+class Compact_Table(object):
+    """
+    Table of interned variable names and constants, which is shared between
+    compact expressions. Entries are never removed from the table. Entries are
+    added under a lock, such that the table can be shared between threads.
+    """
+
+    def __init__(self):
+        self._names = []
+        self._name_indexes = {}
+        self._constants = []
+        self._constant_indexes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names) + len(self._constants)
+
+    def add_name(self, name):
+        """
+        Retrieve the index of a variable or function `name`, adding it to the
+        table if necessary.
+        """
+
+        with self._lock:
+            if name not in self._name_indexes:
+                self._name_indexes[name] = len(self._names)
+                self._names.append(name)
+
+            return self._name_indexes[name]
+
+    def add_constant(self, value):
+        """
+        Retrieve the index of a literal `value`, adding it to the table if
+        necessary. Values of different types, such as `1` and `1.0`, are kept
+        separately.
+        """
+
+        key = (type(value), repr(value))
+        with self._lock:
+            if key not in self._constant_indexes:
+                self._constant_indexes[key] = len(self._constants)
+                self._constants.append(value)
+
+            return self._constant_indexes[key]
+
+    def name(self, index):
+        """
+        Retrieve the name at the `index`.
+        """
+
+        return self._names[index]
+
+    def constant(self, index):
+        """
+        Retrieve the constant value at the `index`.
+        """
+
+        return self._constants[index]
+
+DEFAULT_TABLE = Compact_Table()
+
+class Compact_Expression(object):
+    """
+    Compact representation of a validated expression syntax tree, as returned
+    by `Expression_Parser.compile`, for keeping many expressions in memory.
+
+    The nodes are stored in preorder in an array of integers which refer to
+    node kinds, operators and entries of a `table` of interned names and
+    constants, which defaults to a table shared by all compact expressions.
+    The source positions of the nodes are kept in a separate array that is
+    only consulted when a syntax tree with positions is requested or when an
+    error occurs during evaluation.
+
+    The compact form trades time for memory: every evaluation decodes a
+    temporary syntax tree, which makes it several times slower than
+    evaluating a compiled syntax tree. Expressions that are evaluated often
+    should be kept as syntax trees obtained with `tree`.
+    """
+
+    __slots__ = ('_table', '_code', '_positions')
+
+    # Node kinds
+    _EXPR = 0
+    _ASSIGN = 1
+    _AUG_ASSIGN = 2
+    _BOOL_OP = 3
+    _BIN_OP = 4
+    _UNARY_OP = 5
+    _IF_EXP = 6
+    _COMPARE = 7
+    _CALL = 8
+    _NAME = 9
+    _CONSTANT = 10
+
+    # Operator node types
+    _operators = [
+        ast.And, ast.Or,
+        ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow, ast.LShift,
+        ast.RShift, ast.BitOr, ast.BitXor, ast.BitAnd, ast.FloorDiv,
+        ast.Invert, ast.Not, ast.UAdd, ast.USub,
+        ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Is,
+        ast.IsNot, ast.In, ast.NotIn
+    ]
+    _operator_indexes = dict((op, index) for index, op in enumerate(_operators))
+
+    def __init__(self, tree, table=None):
+        if table is None:
+            table = DEFAULT_TABLE
+
+        self._table = table
+        self._code = array('i')
+        self._positions = array('i')
+
+        if not isinstance(tree, ast.Module) or len(tree.body) != 1:
+            raise Expression_Error('SyntaxError',
+                                   'Exactly one expression must be provided')
+
+        self._encode(tree.body[0])
+
+    def __len__(self):
+        return len(self._positions) // 2
+
+    def _operator(self, node, operator):
+        if type(operator) not in self._operator_indexes:
+            raise Expression_Error('SyntaxError', 'Operator {} not allowed',
+                                   node,
+                                   values=(operator.__class__.__name__,))
+
+        return self._operator_indexes[type(operator)]
+
+    def _encode(self, node):
+        # pylint: disable=too-many-branches
+        code = self._code
+        self._positions.append(getattr(node, 'lineno', 1))
+        self._positions.append(getattr(node, 'col_offset', 0))
+
+        if is_literal(node):
+            code.extend((self._CONSTANT,
+                         self._table.add_constant(literal_value(node))))
+        elif isinstance(node, ast.Name):
+            code.extend((self._NAME, self._table.add_name(node.id)))
+        elif isinstance(node, ast.Expr):
+            code.append(self._EXPR)
+            self._encode(node.value)
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and \
+                isinstance(node.targets[0], ast.Name):
+            code.extend((self._ASSIGN,
+                         self._table.add_name(node.targets[0].id)))
+            self._encode(node.value)
+        elif isinstance(node, ast.AugAssign) and \
+                isinstance(node.target, ast.Name):
+            code.extend((self._AUG_ASSIGN, self._table.add_name(node.target.id),
+                         self._operator(node, node.op)))
+            self._encode(node.value)
+        elif isinstance(node, ast.BoolOp):
+            code.extend((self._BOOL_OP, self._operator(node, node.op),
+                         len(node.values)))
+            for value in node.values:
+                self._encode(value)
+        elif isinstance(node, ast.BinOp):
+            code.extend((self._BIN_OP, self._operator(node, node.op)))
+            self._encode(node.left)
+            self._encode(node.right)
+        elif isinstance(node, ast.UnaryOp):
+            code.extend((self._UNARY_OP, self._operator(node, node.op)))
+            self._encode(node.operand)
+        elif isinstance(node, ast.IfExp):
+            code.append(self._IF_EXP)
+            for child in (node.test, node.body, node.orelse):
+                self._encode(child)
+        elif isinstance(node, ast.Compare):
+            code.extend((self._COMPARE, len(node.ops)))
+            code.extend(self._operator(node, op) for op in node.ops)
+            for child in [node.left] + list(node.comparators):
+                self._encode(child)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and \
+                all(keyword.arg is not None for keyword in node.keywords) and \
+                getattr(node, 'starargs', None) is None and \
+                getattr(node, 'kwargs', None) is None:
+            code.extend((self._CALL, self._table.add_name(node.func.id),
+                         len(node.args), len(node.keywords)))
+            code.extend(self._table.add_name(keyword.arg)
+                        for keyword in node.keywords)
+            for child in node.args:
+                self._encode(child)
+            for keyword in node.keywords:
+                self._encode(keyword.value)
+        else:
+            raise Expression_Error('SyntaxError', 'Node {} not allowed', node,
+                                   values=(node,))
+
+    def tree(self, positions=True):
+        """
+        Create a syntax tree of the expression. If `positions` is disabled,
+        then the nodes have no source positions.
+        """
+
+        nodes = []
+        statement = self._decode(0, nodes)[0]
+        if positions:
+            for index, node in enumerate(nodes):
+                node.lineno = self._positions[2 * index]
+                node.col_offset = self._positions[2 * index + 1]
+
+            return ast.fix_missing_locations(make_module(statement))
+
+        return make_module(statement)
+
+    def evaluate(self, parser, raise_errors=True):
+        """
+        Evaluate the expression using an expression `parser`.
+
+        If `raise_errors` is disabled, then an `Expression_Error` is returned
+        instead of raising a `SyntaxError` when the expression cannot be
+        evaluated. The position of the error is looked up in the table of
+        source positions.
+
+        The syntax tree is decoded for each evaluation and discarded
+        afterward, which is the cost of the smaller memory footprint.
+        """
+
+        nodes = []
+        tree = make_module(self._decode(0, nodes)[0])
+        result = parser.parse(tree, raise_errors=False)
+        if not isinstance(result, Expression_Error):
+            return result
+
+        for index, node in enumerate(nodes):
+            if node is result.node:
+                result.lineno = self._positions[2 * index]
+                result.col_offset = self._positions[2 * index + 1]
+                break
+
+        if raise_errors:
+            raise result.syntax_error()
+
+        return result
+
+    def _decode(self, pos, nodes):
+        # Decode the node at position `pos` of the code array, returning the
+        # node and the position after it. Nodes are added to `nodes` in the
+        # same order as their source positions.
+        code = self._code
+        kind = code[pos]
+        index = len(nodes)
+        nodes.append(None)
+
+        if self._BOOL_OP <= kind <= self._CALL:
+            node, pos = self._decode_operation(kind, pos, nodes)
+        elif kind == self._CONSTANT:
+            node = make_literal(self._table.constant(code[pos + 1]))
+            pos += 2
+        elif kind == self._NAME:
+            node = ast.Name(id=self._table.name(code[pos + 1]), ctx=ast.Load())
+            pos += 2
+        elif kind == self._EXPR:
+            value, pos = self._decode(pos + 1, nodes)
+            node = ast.Expr(value=value)
+        elif kind == self._ASSIGN:
+            target = ast.Name(id=self._table.name(code[pos + 1]),
+                              ctx=ast.Store())
+            value, pos = self._decode(pos + 2, nodes)
+            node = ast.Assign(targets=[target], value=value)
+        elif kind == self._AUG_ASSIGN:
+            target = ast.Name(id=self._table.name(code[pos + 1]),
+                              ctx=ast.Store())
+            operator = self._operators[code[pos + 2]]()
+            value, pos = self._decode(pos + 3, nodes)
+            node = ast.AugAssign(target=target, op=operator, value=value)
+        else:
+            raise ValueError('Unknown node kind {}'.format(kind))
+
+        nodes[index] = node
+        return node, pos
+
+    def _decode_operation(self, kind, pos, nodes):
+        # Decode an operation or function call node whose kind is at position
+        # `pos` of the code array.
+        # pylint: disable=too-many-locals
+        code = self._code
+        if kind == self._BOOL_OP:
+            operator = self._operators[code[pos + 1]]()
+            values, pos = self._decode_many(pos + 3, code[pos + 2], nodes)
+            node = ast.BoolOp(op=operator, values=values)
+        elif kind == self._BIN_OP:
+            operator = self._operators[code[pos + 1]]()
+            (left, right), pos = self._decode_many(pos + 2, 2, nodes)
+            node = ast.BinOp(left=left, op=operator, right=right)
+        elif kind == self._UNARY_OP:
+            operator = self._operators[code[pos + 1]]()
+            operand, pos = self._decode(pos + 2, nodes)
+            node = ast.UnaryOp(op=operator, operand=operand)
+        elif kind == self._IF_EXP:
+            (test, body, orelse), pos = self._decode_many(pos + 1, 3, nodes)
+            node = ast.IfExp(test=test, body=body, orelse=orelse)
+        elif kind == self._COMPARE:
+            count = code[pos + 1]
+            operators = [
+                self._operators[op]() for op in code[pos + 2:pos + 2 + count]
+            ]
+            operands, pos = self._decode_many(pos + 2 + count, count + 1, nodes)
+            node = ast.Compare(left=operands[0], ops=operators,
+                               comparators=operands[1:])
+        else:
+            func = ast.Name(id=self._table.name(code[pos + 1]), ctx=ast.Load())
+            arg_count = code[pos + 2]
+            keyword_count = code[pos + 3]
+            keyword_names = [
+                self._table.name(name)
+                for name in code[pos + 4:pos + 4 + keyword_count]
+            ]
+            values, pos = self._decode_many(pos + 4 + keyword_count,
+                                            arg_count + keyword_count, nodes)
+            keywords = [
+                ast.keyword(arg=name, value=value)
+                for name, value in zip(keyword_names, values[arg_count:])
+            ]
+            node = ast.Call(func=func, args=values[:arg_count],
+                            keywords=keywords)
+
+        return node, pos
+
+    def _decode_many(self, pos, count, nodes):
+        values = []
+        for _ in range(count):
+            value, pos = self._decode(pos, nodes)
+            values.append(value)
+
+        return values, pos
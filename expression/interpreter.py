@@ -20,7 +20,9 @@ limitations under the License.
 from __future__ import print_function
 
 import cmd
+import json
 import sys
+import timeit
 import traceback
 import expression
 
@@ -28,25 +30,130 @@ class Expression_Interpreter(cmd.Cmd):
     """
     Interactive command line interpreter that applies the expression line parser
     to the provided input.
+
+    Commands are prefixed with a colon, such as `:load`. The `quit` and `help`
+    commands may also be used without the prefix.
     """
 
+    # Commands that may be used without prefix
+    _bare_commands = ('quit', 'help')
+
+    # Maximum number of compiled lines to keep
+    _max_compiled = 1000
+
+    # Minimum total duration in seconds of the loops of a timed expression
+    _timeit_duration = 0.2
+
     def __init__(self):
         cmd.Cmd.__init__(self)
         self.prompt = '>> '
         self.parser = expression.Expression_Parser(assignment=True)
+        self._compiled = {}
+
+    def parseline(self, line):
+        stripped = line.strip()
+        if stripped.startswith(':'):
+            return cmd.Cmd.parseline(self, stripped[1:])
+
+        command, arg, line = cmd.Cmd.parseline(self, line)
+        if command in self._bare_commands:
+            return command, arg, line
+
+        return None, None, line
+
+    def _compile(self, line):
+        if line not in self._compiled:
+            if len(self._compiled) >= self._max_compiled:
+                self._compiled.clear()
+
+            self._compiled[line] = self.parser.compile(line)
+
+        return self._compiled[line]
+
+    def _evaluate(self, line):
+        result = self.parser.parse(self._compile(line), raise_errors=False)
+        if isinstance(result, expression.Expression_Error):
+            result.expression = line
+            raise result.syntax_error()
+
+        return result
 
     def default(self, line):
         try:
-            output = self.parser.parse(line)
+            output = self._evaluate(line)
             if output is not None:
                 self.stdout.write(str(output) + '\n')
 
-            variables = self.parser.variables
-            variables.update(self.parser.modified_variables)
-            self.parser.variables = variables
+            self.parser.update_variables(self.parser.modified_variables)
         except SyntaxError:
             traceback.print_exc(0)
 
+    def do_load(self, line):
+        """
+        Load variables into the scope from a JSON file containing an object.
+        """
+
+        try:
+            with open(line.strip()) as variables_file:
+                variables = json.load(variables_file)
+
+            if not isinstance(variables, dict):
+                raise ValueError('File must contain a JSON object')
+
+            self.parser.update_variables(variables)
+        except (IOError, OSError, ValueError, NameError) as error:
+            self.stdout.write('Could not load variables: {}\n'.format(error))
+            return
+
+        self.stdout.write('Loaded {} variables\n'.format(len(variables)))
+
+    def do_timeit(self, line):
+        """
+        Time the evaluation of an expression, using its compiled form.
+        Use `:timeit -n NUMBER EXPRESSION` to set the number of loops.
+        """
+
+        number = None
+        parts = line.split(None, 2)
+        if parts and parts[0] == '-n':
+            if len(parts) != 3 or not parts[1].isdigit() or int(parts[1]) < 1:
+                self.stdout.write('Number of loops must be a positive integer\n')
+                return
+
+            number = int(parts[1])
+            line = parts[2]
+
+        try:
+            self._evaluate(line)
+        except SyntaxError:
+            traceback.print_exc(0)
+            return
+
+        tree = self._compile(line)
+        timer = timeit.Timer(lambda: self.parser.parse(tree))
+        if number is None:
+            number = 1
+            while timer.timeit(number) < self._timeit_duration:
+                number *= 10
+
+        best = min(timer.repeat(3, number)) / number
+        self.stdout.write('{} loops, best of 3: {:.3g} usec per loop\n'.format(
+            number, best * 1e6
+        ))
+
+    def do_vars(self, line):
+        """
+        Show the variables that were used and modified by the most recently
+        evaluated expression.
+        """
+
+        # pylint: disable=unused-argument
+        used = ', '.join(sorted(self.parser.used_variables))
+        modified = ', '.join('{} = {}'.format(name, value) for name, value
+                             in sorted(self.parser.modified_variables.items()))
+        self.stdout.write('Used: {}\n'.format(used))
+        self.stdout.write('Modified: {}\n'.format(modified))
+
     def do_quit(self, line):
         """
         Exit the interpreter.
@@ -0,0 +1,344 @@
+"""
+Interval analysis of expressions against bounds of their variables.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import math
+from .nodes import is_literal, literal_value
+from .parser import Expression_Parser
+
+class Interval_Analyzer(ast.NodeVisitor):
+    """
+    Analyzer that determines whether a validated boolean expression, as
+    returned by `Expression_Parser.compile`, holds for all, none or some of
+    the records whose variables lie within `bounds`, such as the minimum and
+    maximum statistics of a chunk of data.
+
+    The `bounds` dictionary maps variable names to tuples of the lowest and
+    highest number that the variable takes. Other variables may have any
+    value. Each node is evaluated to an interval of the numbers it may yield,
+    where booleans are the integers 0 and 1, or to `None` if its value is
+    unknown. Arithmetic uses the operators of the `parser`, or of a default
+    expression parser, on the bounds of the operands.
+
+    The analysis assumes that the expression is evaluated without errors and
+    that no variable within the bounds is not a number.
+    """
+
+    # Binary operators which are monotonic in each operand as long as the
+    # right operand does not contain zero for the division operators
+    _monotonic_ops = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv)
+    _division_ops = (ast.Div, ast.FloorDiv)
+
+    # Interval results of boolean operations
+    _true = (1, 1)
+    _false = (0, 0)
+    _maybe = (0, 1)
+
+    # Smallest positive number, which bounds the nonzero part of an interval
+    # that starts or ends at zero
+    _tiny = 5e-324
+
+    def __init__(self, bounds, parser=None):
+        if parser is None:
+            parser = Expression_Parser()
+
+        # pylint: disable=protected-access
+        self._binary_ops = parser._binary_ops
+        self._functions = parser.functions
+        self._bounds = bounds
+
+    def analyze(self, tree):
+        """
+        Analyze the syntax tree `tree` of a boolean expression.
+
+        Returns `True` if the expression is truthy for all variables within
+        the bounds, `False` if it is falsy for all of them, and `None` if it
+        may be either.
+        """
+
+        return self._truth(self.visit(tree))
+
+    @staticmethod
+    def _truth(interval):
+        if interval is None:
+            return None
+
+        low, high = interval
+        if low == 0 and high == 0:
+            return False
+        if low > 0 or high < 0:
+            return True
+
+        return None
+
+    @classmethod
+    def _interval(cls, *values):
+        # Create the smallest interval of numbers containing the values.
+        if any(isinstance(value, float) and math.isnan(value)
+               for value in values):
+            return None
+
+        try:
+            return (min(values), max(values))
+        except TypeError:
+            return None
+
+    @classmethod
+    def _hull(cls, intervals):
+        if any(interval is None for interval in intervals):
+            return None
+
+        return cls._interval(*[bound for interval in intervals
+                               for bound in interval])
+
+    @classmethod
+    def _boolean(cls, truth):
+        if truth is None:
+            return cls._maybe
+
+        return cls._true if truth else cls._false
+
+    def visit_Module(self, node):
+        """
+        Visit the root module node.
+        """
+
+        if len(node.body) != 1:
+            return None
+
+        return self.visit(node.body[0])
+
+    def visit_Expr(self, node):
+        """
+        Visit an expression node.
+        """
+
+        return self.visit(node.value)
+
+    def visit_Assign(self, node):
+        """
+        Visit an assignment node.
+        """
+
+        return self.visit(node.value)
+
+    def visit_Name(self, node):
+        """
+        Visit a named variable node.
+        """
+
+        if is_literal(node):
+            return self._literal(literal_value(node))
+
+        if node.id not in self._bounds:
+            return None
+
+        return self._interval(*self._bounds[node.id])
+
+    def visit_Num(self, node):
+        """
+        Visit a literal number node.
+        """
+
+        return self._literal(literal_value(node))
+
+    def visit_NameConstant(self, node):
+        """
+        Visit a named constant node.
+        """
+
+        return self._literal(literal_value(node))
+
+    def visit_Constant(self, node):
+        """
+        Visit a constant node.
+        """
+
+        return self._literal(literal_value(node))
+
+    def _literal(self, value):
+        if value is None or isinstance(value, complex):
+            return None
+
+        return self._interval(value)
+
+    def visit_BoolOp(self, node):
+        """
+        Visit a boolean expression node.
+        """
+
+        # An `and` operation returns the first falsy operand and an `or`
+        # operation the first truthy operand, or else the last operand.
+        stop = isinstance(node.op, ast.Or)
+        results = []
+        for index, value in enumerate(node.values):
+            interval = self.visit(value)
+            truth = self._truth(interval)
+            if truth is stop or index == len(node.values) - 1:
+                results.append(interval)
+                break
+            if truth is None:
+                results.append(self._part(interval, stop))
+
+        return self._hull(results)
+
+    def _part(self, interval, truth):
+        # Restrict an interval to its truthy or falsy numbers.
+        if interval is None:
+            return None
+        if not truth:
+            return self._false
+
+        low, high = interval
+        if low == 0:
+            return (self._tiny, high)
+        if high == 0:
+            return (low, -self._tiny)
+
+        return interval
+
+    def visit_BinOp(self, node):
+        """
+        Visit a binary expression node.
+        """
+
+        left = self.visit(node.left)
+        right = self.visit(node.right)
+        if left is None or right is None or \
+                not isinstance(node.op, self._monotonic_ops):
+            return None
+
+        if isinstance(node.op, self._division_ops) and \
+                right[0] <= 0 <= right[1]:
+            return None
+
+        # The extremes of a monotonic operation are found at the bounds.
+        func = self._binary_ops[type(node.op)]
+        try:
+            values = [func(x, y) for x in left for y in right]
+        except (ArithmeticError, ValueError):
+            return None
+
+        return self._interval(*values)
+
+    def visit_UnaryOp(self, node):
+        """
+        Visit a unary expression node.
+        """
+
+        operand = self.visit(node.operand)
+        if isinstance(node.op, ast.Not):
+            truth = self._truth(operand)
+            return self._boolean(None if truth is None else not truth)
+
+        if operand is None:
+            return None
+        if isinstance(node.op, ast.USub):
+            return (-operand[1], -operand[0])
+        if isinstance(node.op, ast.UAdd):
+            return operand
+
+        return None
+
+    def visit_IfExp(self, node):
+        """
+        Visit an inline if..else expression node.
+        """
+
+        truth = self._truth(self.visit(node.test))
+        if truth is None:
+            return self._hull([self.visit(node.body), self.visit(node.orelse)])
+
+        return self.visit(node.body if truth else node.orelse)
+
+    def visit_Compare(self, node):
+        """
+        Visit a comparison expression node.
+        """
+
+        # Chained comparisons compare the result of the previous operator.
+        left = self.visit(node.left)
+        for operator, comparator in zip(node.ops, node.comparators):
+            right = self.visit(comparator)
+            left = self._boolean(self._compare(operator, left, right))
+
+        return left
+
+    @staticmethod
+    def _compare(operator, left, right):
+        # pylint: disable=too-many-return-statements
+        if left is None or right is None:
+            return None
+
+        if isinstance(operator, (ast.Gt, ast.GtE)):
+            left, right = right, left
+            operator = ast.Lt() if isinstance(operator, ast.Gt) else ast.LtE()
+
+        if isinstance(operator, ast.Lt):
+            if left[1] < right[0]:
+                return True
+            if left[0] >= right[1]:
+                return False
+        elif isinstance(operator, ast.LtE):
+            if left[1] <= right[0]:
+                return True
+            if left[0] > right[1]:
+                return False
+        elif isinstance(operator, (ast.Eq, ast.NotEq)):
+            equal = None
+            if left[0] == left[1] == right[0] == right[1]:
+                equal = True
+            elif left[1] < right[0] or right[1] < left[0]:
+                equal = False
+
+            if equal is None or isinstance(operator, ast.Eq):
+                return equal
+
+            return not equal
+
+        return None
+
+    def visit_Call(self, node):
+        """
+        Visit a function call node.
+        """
+
+        name = node.func.id
+        if name in self._functions or len(node.args) != 1 or node.keywords:
+            return None
+
+        operand = self.visit(node.args[0])
+        if name == 'bool':
+            return self._boolean(self._truth(operand))
+        if operand is None or name not in ('int', 'float'):
+            return None
+
+        # Conversions to numbers are monotonic.
+        func = int if name == 'int' else float
+        try:
+            return self._interval(func(operand[0]), func(operand[1]))
+        except (ArithmeticError, ValueError):
+            return None
+
+    def generic_visit(self, node):
+        """
+        Visit a node that has no specific analysis, such as an augmented
+        assignment, whose value is unknown.
+        """
+
+        return None
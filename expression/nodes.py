@@ -0,0 +1,154 @@
+"""
+Helpers for syntax tree nodes that differ between Python versions.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import sys
+
+# Node types of literal numbers and named constants. Python 3.8 and later
+# use a single node type for all constants.
+if sys.version_info >= (3, 8):
+    _LITERAL_NODES = (ast.Constant,)
+else:
+    _LITERAL_NODES = tuple(
+        getattr(ast, name) for name in ('Num', 'NameConstant')
+        if hasattr(ast, name)
+    )
+
+# Named constants, which are name nodes in Python 2.7
+_NAMED_CONSTANTS = {
+    'True': True,
+    'False': False,
+    'None': None
+}
+
+# Types of literal values that the expression parser accepts
+if sys.version_info < (3,):
+    # pylint: disable=undefined-variable
+    _LITERAL_TYPES = (bool, int, long, float, complex, type(None))
+else:
+    _LITERAL_TYPES = (bool, int, float, complex, type(None))
+
+def is_literal(node):
+    """
+    Check whether the syntax tree `node` is a literal number or a named
+    constant such as `True` or `None`.
+    """
+
+    if isinstance(node, ast.Name):
+        return node.id in _NAMED_CONSTANTS
+
+    if isinstance(node, _LITERAL_NODES):
+        return isinstance(literal_value(node), _LITERAL_TYPES)
+
+    return False
+
+def is_literal_value(value):
+    """
+    Check whether `value` can be represented as a literal node.
+    """
+
+    return isinstance(value, _LITERAL_TYPES)
+
+def literal_value(node):
+    """
+    Retrieve the value of a literal node. The node must be a literal as
+    determined by `is_literal`.
+    """
+
+    if isinstance(node, ast.Name):
+        return _NAMED_CONSTANTS[node.id]
+
+    if hasattr(node, 'value'):
+        return node.value
+
+    return node.n
+
+def is_signed_literal(node):
+    """
+    Check whether the syntax tree `node` is a literal as determined by
+    `is_literal`, or a unary minus or plus applied to a literal number, such
+    as `-5` which is a unary operation in Python 3.
+    """
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        if not is_literal(node.operand):
+            return False
+
+        value = literal_value(node.operand)
+        return value is not None and not isinstance(value, bool)
+
+    return is_literal(node)
+
+def signed_literal_value(node):
+    """
+    Retrieve the value of a literal node or a signed literal number. The node
+    must be a literal as determined by `is_signed_literal`.
+    """
+
+    if isinstance(node, ast.UnaryOp):
+        value = literal_value(node.operand)
+        return -value if isinstance(node.op, ast.USub) else value
+
+    return literal_value(node)
+
+def make_literal(value, node=None):
+    """
+    Create a literal node for the number or named constant `value`. If `node`
+    is provided, then its source position is copied to the new node.
+    """
+
+    if sys.version_info >= (3, 8):
+        literal = ast.Constant(value=value, kind=None)
+    elif isinstance(value, bool) or value is None:
+        if hasattr(ast, 'NameConstant'):
+            literal = ast.NameConstant(value=value)
+        else:
+            literal = ast.Name(id=repr(value), ctx=ast.Load())
+    else:
+        literal = ast.Num(n=value)
+
+    if node is None:
+        literal.lineno = 1
+        literal.col_offset = 0
+        return literal
+
+    return ast.copy_location(literal, node)
+
+def make_module(statement):
+    """
+    Create a module node containing the single syntax tree `statement`.
+    """
+
+    if sys.version_info >= (3, 8):
+        return ast.Module(body=[statement], type_ignores=[])
+
+    return ast.Module(body=[statement])
+
+def expression_node(tree):
+    """
+    Retrieve the expression of the syntax tree `tree` if it is a module with
+    a single expression statement, or else the node itself.
+    """
+
+    node = tree
+    if isinstance(node, ast.Module) and len(node.body) == 1:
+        node = node.body[0]
+    if isinstance(node, ast.Expr):
+        node = node.value
+
+    return node
@@ -19,6 +19,108 @@ limitations under the License.
 # Use Python 3 division
 from __future__ import division
 import ast
+import sys
+from .cache import Expression_Cache
+from .nodes import is_literal
+
+class Expression_Error(Exception):
+    """
+    Structured error that occurred while parsing or evaluating an expression.
+
+    The error provides the `kind` of error, which is the name of an exception
+    class such as `NameError`, the syntax tree `node` at which the error
+    occurred and the `lineno` and `col_offset` of its position in the
+    expression, and the offending variable or function `name`, if
+    applicable. The `expression` text and `filename` are set once the error
+    leaves the parser.
+
+    The `message` and a `SyntaxError` created with `syntax_error` are only
+    formatted on request.
+    """
+
+    # The public attributes describe the error and its position, and the
+    # private attributes keep what is needed to format the message lazily.
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, kind, template, node=None, name=None, values=None):
+        super(Expression_Error, self).__init__(kind, template)
+        self.kind = kind
+        self.node = node
+        self.name = name
+        self.lineno = getattr(node, 'lineno', 1)
+        self.col_offset = getattr(node, 'col_offset', 0)
+        self.expression = None
+        self.filename = '<expression>'
+
+        self._template = template
+        if values is None:
+            self._values = () if name is None else (name,)
+        else:
+            self._values = values
+
+        self._exception = None
+
+    @classmethod
+    def from_exception(cls, error):
+        """
+        Create a structured error from another exception `error`.
+        """
+
+        if isinstance(error, cls):
+            return error
+
+        if isinstance(error, SyntaxError):
+            result = cls('SyntaxError', '{}', values=(error.msg,))
+            result.lineno = error.lineno or 1
+            result.col_offset = error.offset or 0
+            result._exception = error
+            return result
+
+        result = cls(error.__class__.__name__, '{}',
+                     values=(error.args[0] if error.args else '',))
+        if len(error.args) > 2:
+            result.lineno, result.col_offset = error.args[1:3]
+
+        return result
+
+    @property
+    def message(self):
+        """
+        Retrieve the formatted error message.
+        """
+
+        values = [
+            ast.dump(value) if isinstance(value, ast.AST) else value
+            for value in self._values
+        ]
+        return self._template.format(*values)
+
+    def syntax_error(self):
+        """
+        Create a `SyntaxError` with context parameters for the error.
+        """
+
+        if self._exception is not None:
+            self._exception.filename = self.filename
+            self._exception.text = self.expression
+            return self._exception
+
+        if self.kind == 'SyntaxError':
+            message = self.message
+        else:
+            message = '{}: {}'.format(self.kind, self.message)
+
+        return SyntaxError(message, (self.filename, self.lineno,
+                                     self.col_offset, self.expression))
+
+    def __str__(self):
+        return self.message
+
+    def __reduce__(self):
+        state = self.__dict__.copy()
+        state['node'] = None
+        state['_exception'] = None
+        return (self.__class__, (self.kind, self._template), state)
 
 class Expression_Parser(ast.NodeVisitor):
     """
@@ -26,6 +128,13 @@ class Expression_Parser(ast.NodeVisitor):
     functions or control structures (inline if..else is allowed though).
     """
 
+    # The parser keeps its scope, its compiled and result caches, and the
+    # variables tracked during the most recent evaluation.
+    # pylint: disable=too-many-instance-attributes
+    # Besides the visitor methods, the parser provides methods to compile and
+    # inspect expressions and properties for its configuration.
+    # pylint: disable=too-many-public-methods
+
     # Boolean operators
     # The AST nodes may have multiple ops and right comparators, but we
     # evaluate each op individually.
@@ -88,7 +197,16 @@ class Expression_Parser(ast.NodeVisitor):
         'bool': bool
     }
 
-    def __init__(self, variables=None, functions=None, assignment=False):
+    # Node types that are evaluated by a visitor method
+    _visited_types = (ast.mod, ast.stmt, ast.expr, ast.keyword)
+
+    # Node type of constants in Python 3.8 and later, which is only allowed
+    # for literal numbers and named constants
+    _constant_type = getattr(ast, 'Constant', ())
+
+    def __init__(self, variables=None, functions=None, assignment=False,
+                 cache_dir=None, result_cache=None):
+        # pylint: disable=too-many-arguments
         self._variables = None
         self.variables = variables
 
@@ -100,33 +218,188 @@ class Expression_Parser(ast.NodeVisitor):
         self._assignment = False
         self.assignment = assignment
 
+        if cache_dir is None:
+            self._cache = None
+        else:
+            self._cache = Expression_Cache(cache_dir)
+
+        self._result_cache = result_cache
+
         self._used_variables = set()
         self._modified_variables = {}
 
-    def parse(self, expression, filename='<expression>'):
+    def parse(self, expression, filename='<expression>', raise_errors=True):
         """
         Parse a string `expression` and return its result.
+
+        The `expression` may also be a syntax tree returned by `compile`, in
+        which case the expression is only evaluated.
+
+        If `raise_errors` is disabled, then an `Expression_Error` is returned
+        instead of raising a `SyntaxError` when the expression is invalid or
+        cannot be evaluated.
+
+        If the parser has a result cache, then the result may be retrieved
+        from the cache without evaluating the expression.
         """
 
         self._used_variables = set()
         self._modified_variables = {}
 
+        if isinstance(expression, ast.AST):
+            tree = expression
+            expression = None
+        else:
+            tree = None
+
         try:
-            return self.visit(ast.parse(expression))
-        except SyntaxError as error:
-            error.filename = filename
-            error.text = expression
-            raise error
+            if self._result_cache is not None:
+                return self._visit_cached(expression if tree is None else tree)
+
+            if tree is None:
+                if self._cache is None:
+                    tree = ast.parse(expression)
+                else:
+                    tree = self._compile(expression)
+
+            return self.visit(tree)
         except Exception as error:
-            error_type = error.__class__.__name__
-            if len(error.args) > 2:
-                line_col = error.args[1:]
-            else:
-                line_col = (1, 0)
+            error = self._format_error(error, expression, filename)
+            if raise_errors:
+                raise error.syntax_error()
+
+            return error
+
+    def _visit_cached(self, expression):
+        plan_key, tree, names = self._result_cache.plan(self, expression)
+        if names is None:
+            return self.visit(tree)
+
+        try:
+            values = tuple(self._variables[name] for name in names)
+            key = (plan_key, values, tuple(type(value) for value in values))
+            hash(key)
+        except (KeyError, TypeError):
+            return self.visit(tree)
+
+        entry = self._result_cache.get(key)
+        if entry is not None:
+            result, used_variables = entry
+            self._used_variables = set(used_variables)
+            return result
+
+        result = self.visit(tree)
+        self._result_cache.put(key, result, self._used_variables)
+        return result
+
+    def find_variables(self, tree):
+        """
+        Retrieve the names of the variables that the syntax tree `tree` may
+        read when it is evaluated, regardless of the current scope. Named
+        constants, function names and assignment targets are excluded, except
+        for targets of augmented assignments.
+        """
+
+        functions = set()
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                functions.add(node.func)
+            elif isinstance(node, ast.AugAssign) and \
+                    isinstance(node.target, ast.Name):
+                names.add(node.target.id)
+            elif isinstance(node, ast.Name) and node not in functions and \
+                    isinstance(node.ctx, ast.Load) and \
+                    node.id not in self._variable_names:
+                names.add(node.id)
+
+        return names
 
-            error = SyntaxError('{}: {}'.format(error_type, error.args[0]),
-                                (filename,) + line_col + (expression,))
-            raise error
+    def compile(self, expression, filename='<expression>'):
+        """
+        Parse a string `expression` and validate its structure without
+        evaluating it. The returned syntax tree can be passed to `parse`
+        in order to evaluate the expression without parsing it again.
+
+        If the parser has a cache directory, then the validated syntax tree
+        is retrieved from or stored in the cache.
+        """
+
+        try:
+            return self._compile(expression)
+        except Exception as error:
+            raise self._format_error(error, expression, filename).syntax_error()
+
+    @staticmethod
+    def _format_error(error, expression, filename):
+        error = Expression_Error.from_exception(error)
+        error.expression = expression
+        error.filename = filename
+        return error
+
+    def _compile(self, expression):
+        if self._cache is None:
+            tree = ast.parse(expression)
+            self._validate(tree)
+            return tree
+
+        # Trees from the cache directory are validated again when they are
+        # decoded, since another process may have written them. Trees that
+        # the cache keeps in memory are returned directly.
+        key = self._cache.key(expression, self._cache_config())
+        tree = self._cache.load(key, self._validate)
+        if tree is not None:
+            return tree
+
+        tree = ast.parse(expression)
+        self._validate(tree)
+        self._cache.store(key, tree)
+        return tree
+
+    def _cache_config(self):
+        # Describe the parser configuration that influences the validity of
+        # a syntax tree, including the Python version that created the tree.
+        operators = [
+            sorted(op.__name__ for op in ops) for ops in (
+                self._boolean_ops, self._binary_ops, self._unary_ops,
+                self._compare_ops
+            )
+        ]
+        return '{}.{} {} {}'.format(sys.version_info[0], sys.version_info[1],
+                                    self.assignment, operators)
+
+    def _validate(self, tree):
+        # Check the structure of the syntax tree without evaluating it.
+        self._check_module(tree)
+        for node in ast.walk(tree):
+            if not isinstance(node, self._visited_types):
+                continue
+
+            if not hasattr(self, 'visit_{}'.format(node.__class__.__name__)):
+                self.generic_visit(node)
+            if isinstance(node, self._constant_type) and not is_literal(node):
+                self.generic_visit(node)
+            if isinstance(node, ast.Call) and not isinstance(node.func, ast.Name):
+                raise Expression_Error('SyntaxError',
+                                       'Only named functions can be called', node)
+
+            if isinstance(node, (ast.Assign, ast.AugAssign)):
+                self._check_assignment(node)
+            if isinstance(node, ast.BoolOp):
+                self._check_operator(node, node.op, self._boolean_ops)
+            elif isinstance(node, (ast.BinOp, ast.AugAssign)):
+                self._check_operator(node, node.op, self._binary_ops)
+            elif isinstance(node, ast.UnaryOp):
+                self._check_operator(node, node.op, self._unary_ops)
+            elif isinstance(node, ast.Compare):
+                for operator in node.ops:
+                    self._check_operator(node, operator, self._compare_ops)
+
+    @staticmethod
+    def _check_operator(node, operator, operators):
+        if type(operator) not in operators:
+            raise Expression_Error('SyntaxError', 'Operator {} not allowed', node,
+                                   values=(operator.__class__.__name__,))
 
     @property
     def variables(self):
@@ -152,6 +425,22 @@ class Expression_Parser(ast.NodeVisitor):
         else:
             variables = variables.copy()
 
+        self._check_variables(variables)
+        self._variables = variables
+
+    def update_variables(self, variables):
+        """
+        Add or replace variables in the scope of the parser using the
+        dictionary `variables`, without copying the existing scope.
+
+        If built-in keyword names `True`, `False` or `None` are used, then
+        this method raises a `NameError` and the scope is left unchanged.
+        """
+
+        self._check_variables(variables)
+        self._variables.update(variables)
+
+    def _check_variables(self, variables):
         variable_names = set(variables.keys())
         constant_names = set(self._variable_names.keys())
         forbidden_variables = variable_names.intersection(constant_names)
@@ -160,7 +449,15 @@ class Expression_Parser(ast.NodeVisitor):
             forbidden = ', '.join(forbidden_variables)
             raise NameError('Cannot override {} {}'.format(keyword, forbidden))
 
-        self._variables = variables
+    @property
+    def functions(self):
+        """
+        Retrieve the custom functions that exist in the scope of the parser.
+
+        This property returns a copy of the dictionary.
+        """
+
+        return self._functions.copy()
 
     @property
     def assignment(self):
@@ -178,6 +475,27 @@ class Expression_Parser(ast.NodeVisitor):
 
         self._assignment = bool(value)
 
+    @property
+    def cache_dir(self):
+        """
+        Retrieve the path to the directory in which compiled expressions are
+        cached, or `None` if the parser does not use a cache directory.
+        """
+
+        if self._cache is None:
+            return None
+
+        return self._cache.directory
+
+    @property
+    def result_cache(self):
+        """
+        Retrieve the cache of expression results used by the parser, or `None`
+        if the parser does not cache results.
+        """
+
+        return self._result_cache
+
     @property
     def used_variables(self):
         """
@@ -211,26 +529,28 @@ class Expression_Parser(ast.NodeVisitor):
         This visitor denies any nodes that may not be part of the expression.
         """
 
-        raise SyntaxError('Node {} not allowed'.format(ast.dump(node)),
-                          ('', node.lineno, node.col_offset, ''))
+        raise Expression_Error('SyntaxError', 'Node {} not allowed', node,
+                               values=(node,))
 
     def visit_Module(self, node):
         """
         Visit the root module node.
         """
 
-        if len(node.body) != 1:
-            if len(node.body) > 1:
-                lineno = node.body[1].lineno
-                col_offset = node.body[1].col_offset
-            else:
-                lineno = 1
-                col_offset = 0
+        self._check_module(node)
+        return self.visit(node.body[0])
 
-            raise SyntaxError('Exactly one expression must be provided',
-                              ('', lineno, col_offset, ''))
+    @staticmethod
+    def _check_module(node):
+        if not isinstance(node, ast.Module) or len(node.body) != 1:
+            if isinstance(node, ast.Module) and len(node.body) > 1:
+                position = node.body[1]
+            else:
+                position = None
 
-        return self.visit(node.body[0])
+            raise Expression_Error('SyntaxError',
+                                   'Exactly one expression must be provided',
+                                   position)
 
     def visit_Expr(self, node):
         """
@@ -301,8 +621,8 @@ class Expression_Parser(ast.NodeVisitor):
         elif name in self._function_names:
             func = self._function_names[name]
         else:
-            raise NameError("Function '{}' is not defined".format(name),
-                            node.lineno, node.col_offset)
+            raise Expression_Error('NameError', "Function '{}' is not defined",
+                                   node, name=name)
 
         args = [self.visit(arg) for arg in node.args]
         keywords = dict([self.visit(keyword) for keyword in node.keywords])
@@ -310,8 +630,8 @@ class Expression_Parser(ast.NodeVisitor):
         # Python 2.7 starred arguments
         if hasattr(node, 'starargs') and hasattr(node, 'kwargs'):
             if node.starargs is not None or node.kwargs is not None:
-                raise SyntaxError('Star arguments are not supported',
-                                  ('', node.lineno, node.col_offset, ''))
+                raise Expression_Error('SyntaxError',
+                                       'Star arguments are not supported', node)
 
         return func(*args, **keywords)
 
@@ -320,17 +640,7 @@ class Expression_Parser(ast.NodeVisitor):
         Visit an assignment node.
         """
 
-        if not self.assignment:
-            raise SyntaxError('Assignments are not allowed in this expression',
-                              ('', node.lineno, node.col_offset, ''))
-
-        if len(node.targets) != 1:
-            raise SyntaxError('Multiple-target assignments are not supported',
-                              ('', node.lineno, node.col_offset, ''))
-        if not isinstance(node.targets[0], ast.Name):
-            raise SyntaxError('Assignment target must be a variable name',
-                              ('', node.lineno, node.col_offset, ''))
-
+        self._check_assignment(node)
         name = node.targets[0].id
         self._modified_variables[name] = self.visit(node.value)
 
@@ -339,24 +649,38 @@ class Expression_Parser(ast.NodeVisitor):
         Visit an augmented assignment node.
         """
 
-        if not self.assignment:
-            raise SyntaxError('Assignments are not allowed in this expression',
-                              ('', node.lineno, node.col_offset, ''))
-
-        if not isinstance(node.target, ast.Name):
-            raise SyntaxError('Assignment target must be a variable name',
-                              ('', node.lineno, node.col_offset, ''))
-
+        self._check_assignment(node)
         name = node.target.id
         if name not in self._variables:
-            raise NameError("Assignment name '{}' is not defined".format(name),
-                            node.lineno, node.col_offset)
+            raise Expression_Error('NameError',
+                                   "Assignment name '{}' is not defined",
+                                   node, name=name)
 
         op = type(node.op)
         func = self._binary_ops[op]
         self._modified_variables[name] = func(self._variables[name],
                                               self.visit(node.value))
 
+    def _check_assignment(self, node):
+        if not self.assignment:
+            raise Expression_Error('SyntaxError',
+                                   'Assignments are not allowed in this expression',
+                                   node)
+
+        if isinstance(node, ast.Assign):
+            if len(node.targets) != 1:
+                raise Expression_Error('SyntaxError',
+                                       'Multiple-target assignments are not supported',
+                                       node)
+            target = node.targets[0]
+        else:
+            target = node.target
+
+        if not isinstance(target, ast.Name):
+            raise Expression_Error('SyntaxError',
+                                   'Assignment target must be a variable name',
+                                   node)
+
     def visit_Starred(self, node):
         """
         Visit a starred function keyword argument node.
@@ -364,8 +688,8 @@ class Expression_Parser(ast.NodeVisitor):
 
         # pylint: disable=no-self-use
 
-        raise SyntaxError('Star arguments are not supported',
-                          ('', node.lineno, node.col_offset, ''))
+        raise Expression_Error('SyntaxError', 'Star arguments are not supported',
+                               node)
 
     def visit_keyword(self, node):
         """
@@ -373,8 +697,8 @@ class Expression_Parser(ast.NodeVisitor):
         """
 
         if node.arg is None:
-            raise SyntaxError('Star arguments are not supported',
-                              ('', node.lineno, node.col_offset, ''))
+            raise Expression_Error('SyntaxError',
+                                   'Star arguments are not supported', node)
 
         return (node.arg, self.visit(node.value))
 
@@ -398,8 +722,8 @@ class Expression_Parser(ast.NodeVisitor):
         if node.id in self._variable_names:
             return self._variable_names[node.id]
 
-        raise NameError("Name '{}' is not defined".format(node.id),
-                        node.lineno, node.col_offset)
+        raise Expression_Error('NameError', "Name '{}' is not defined", node,
+                               name=node.id)
 
     def visit_NameConstant(self, node):
         """
@@ -0,0 +1,183 @@
+"""
+Partial evaluation of expressions against a subset of known variables.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import copy
+from .nodes import is_literal, is_literal_value, literal_value, make_literal
+
+class Expression_Specializer(ast.NodeTransformer):
+    """
+    Transformer that specializes a validated expression syntax tree, as
+    returned by `Expression_Parser.compile`, against a partial scope of known
+    `variables`.
+
+    Known variables whose values are numbers or named constants are replaced
+    by literals, and operations on literals are folded using the operators of
+    the `parser`. Inline if..else expressions and `and` and `or` operations
+    are pruned when their tests have become constant, in which case the
+    pruned operands are no longer evaluated. Operations that would raise an
+    error are left in place, such that the error occurs during evaluation.
+    Known variables with other values, such as lists, are kept as names.
+
+    The residual syntax tree can be evaluated using `Expression_Parser.parse`.
+    """
+
+    # Maximum right operand of a power or left shift operation to fold
+    _max_fold_exponent = 64
+
+    def __init__(self, parser, variables):
+        # pylint: disable=protected-access
+        self._boolean_ops = parser._boolean_ops
+        self._binary_ops = parser._binary_ops
+        self._unary_ops = parser._unary_ops
+        self._compare_ops = parser._compare_ops
+        self._variables = variables
+
+    def specialize(self, tree):
+        """
+        Create a residual syntax tree of `tree` in which the known variables
+        are substituted and constant parts are folded. The original syntax
+        tree is not altered.
+        """
+
+        residual = self.visit(copy.deepcopy(tree))
+        return ast.fix_missing_locations(residual)
+
+    def _fold(self, node, func, *operands):
+        try:
+            value = func(*[literal_value(operand) for operand in operands])
+        except Exception: # pylint: disable=broad-except
+            return node
+
+        if not is_literal_value(value):
+            return node
+
+        return make_literal(value, node)
+
+    def visit_Name(self, node):
+        """
+        Visit a named variable node.
+        """
+
+        if isinstance(node.ctx, ast.Load) and node.id in self._variables:
+            value = self._variables[node.id]
+            if is_literal_value(value):
+                return make_literal(value, node)
+
+        return node
+
+    def visit_Call(self, node):
+        """
+        Visit a function call node.
+        """
+
+        # Function names are separate from variables, so only the arguments
+        # are specialized.
+        node.args = [self.visit(arg) for arg in node.args]
+        for keyword in node.keywords:
+            keyword.value = self.visit(keyword.value)
+
+        return node
+
+    def visit_BoolOp(self, node):
+        """
+        Visit a boolean expression node.
+        """
+
+        self.generic_visit(node)
+
+        # An `and` operation stops at the first falsy operand and an `or`
+        # operation stops at the first truthy operand.
+        stop = isinstance(node.op, ast.Or)
+        values = []
+        for index, value in enumerate(node.values):
+            if is_literal(value):
+                if bool(literal_value(value)) is stop:
+                    values.append(value)
+                    break
+                if index < len(node.values) - 1:
+                    continue
+
+            values.append(value)
+
+        if len(values) == 1:
+            return values[0]
+
+        node.values = values
+        return node
+
+    def visit_BinOp(self, node):
+        """
+        Visit a binary expression node.
+        """
+
+        self.generic_visit(node)
+        if not is_literal(node.left) or not is_literal(node.right):
+            return node
+
+        op = type(node.op)
+        if op in (ast.Pow, ast.LShift):
+            exponent = literal_value(node.right)
+            if not isinstance(exponent, (int, float)) or \
+                    exponent > self._max_fold_exponent:
+                return node
+
+        return self._fold(node, self._binary_ops[op], node.left, node.right)
+
+    def visit_UnaryOp(self, node):
+        """
+        Visit a unary expression node.
+        """
+
+        self.generic_visit(node)
+        if not is_literal(node.operand):
+            return node
+
+        return self._fold(node, self._unary_ops[type(node.op)], node.operand)
+
+    def visit_IfExp(self, node):
+        """
+        Visit an inline if..else expression node.
+        """
+
+        self.generic_visit(node)
+        if not is_literal(node.test):
+            return node
+
+        return node.body if literal_value(node.test) else node.orelse
+
+    def visit_Compare(self, node):
+        """
+        Visit a comparison expression node.
+        """
+
+        self.generic_visit(node)
+        operands = [node.left] + list(node.comparators)
+        if not all(is_literal(operand) for operand in operands):
+            return node
+
+        # Chained comparisons compare the result of the previous operator.
+        funcs = [self._compare_ops[type(operator)] for operator in node.ops]
+        def compare(*values):
+            result = values[0]
+            for func, value in zip(funcs, values[1:]):
+                result = func(result, value)
+
+            return result
+
+        return self._fold(node, compare, *operands)
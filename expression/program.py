@@ -0,0 +1,177 @@
+"""
+Programs of named expressions evaluated in the order of their dependencies.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import copy
+from functools import partial
+from multiprocessing.pool import ThreadPool
+from .parser import Expression_Parser
+
+class Expression_Program(object):
+    """
+    Program of named expressions that may refer to each other's results.
+
+    The `definitions` are a dictionary or a sequence of pairs of names and
+    expressions, such as those returned by `batch.read_expressions`. Each
+    expression is either a string or a syntax tree returned by `compile`, and
+    is compiled once using `parser`, or a default expression parser. The
+    names that each expression reads determine its dependencies, and the
+    definitions are grouped in levels such that every definition only depends
+    on definitions in earlier levels. A `ValueError` is raised if a name is
+    defined more than once or if definitions depend on each other cyclically.
+    """
+
+    def __init__(self, definitions, parser=None):
+        if parser is None:
+            parser = Expression_Parser()
+
+        if isinstance(definitions, dict):
+            definitions = definitions.items()
+
+        self._parser = parser
+        self._trees = {}
+        self._names = []
+        for name, expression in definitions:
+            if name in self._trees:
+                raise ValueError('Name {} is defined more than once'.format(name))
+
+            if isinstance(expression, ast.AST):
+                tree = expression
+            else:
+                tree = parser.compile(expression,
+                                      filename=self._filename(name))
+
+            self._trees[name] = tree
+            self._names.append(name)
+
+        self._dependencies = dict(
+            (name, parser.find_variables(tree).intersection(self._trees))
+            for name, tree in self._trees.items()
+        )
+        self._levels = self._sort()
+
+    def _sort(self):
+        # Group the definitions in topological levels, keeping the order in
+        # which they were defined within each level.
+        levels = []
+        done = set()
+        remaining = list(self._names)
+        while remaining:
+            level = [
+                name for name in remaining
+                if self._dependencies[name].issubset(done)
+            ]
+            if not level:
+                raise ValueError('Definitions have a cyclic dependency: {}'.format(
+                    ' -> '.join(self._cycle(remaining))
+                ))
+
+            levels.append(level)
+            done.update(level)
+            remaining = [name for name in remaining if name not in done]
+
+        return levels
+
+    def _cycle(self, remaining):
+        # Follow unresolved dependencies until a name repeats.
+        path = [remaining[0]]
+        while True:
+            name = min(dependency for dependency in self._dependencies[path[-1]]
+                       if dependency in remaining)
+            if name in path:
+                return path[path.index(name):] + [name]
+
+            path.append(name)
+
+    @property
+    def names(self):
+        """
+        Retrieve the defined names in the order of their definition.
+        """
+
+        return list(self._names)
+
+    @property
+    def levels(self):
+        """
+        Retrieve the names of the definitions grouped by level, where every
+        definition only depends on definitions in earlier levels.
+        """
+
+        return [list(level) for level in self._levels]
+
+    def dependencies(self, name):
+        """
+        Retrieve the set of defined names that the definition of `name` reads.
+        """
+
+        return set(self._dependencies[name])
+
+    def run(self, variables=None, workers=None):
+        """
+        Evaluate the definitions in the order of their levels, using the
+        dictionary `variables` for names that the program does not define.
+
+        Returns a dictionary of the results of the definitions. The scope of
+        the parser is replaced by the variables and the results.
+
+        If `workers` is more than one, then the definitions within a level are
+        evaluated concurrently by that number of threads, each with a copy of
+        the parser that shares its result cache. This only speeds up programs
+        whose functions release the interpreter lock, such as functions that
+        perform I/O. Errors are raised as a `SyntaxError` like in
+        `Expression_Parser.parse`.
+        """
+
+        parser = self._parser
+        parser.variables = variables
+        results = {}
+        if workers is None or workers <= 1:
+            for level in self._levels:
+                for name in level:
+                    results[name] = parser.parse(self._trees[name],
+                                                 filename=self._filename(name))
+                    parser.update_variables({name: results[name]})
+
+            return results
+
+        pool = ThreadPool(workers)
+        try:
+            for level in self._levels:
+                scope = parser.variables
+                values = pool.map(partial(self._evaluate, scope), level)
+                level_results = dict(zip(level, values))
+                results.update(level_results)
+                parser.update_variables(level_results)
+        finally:
+            pool.close()
+            pool.join()
+
+        return results
+
+    def _evaluate(self, scope, name):
+        # Evaluate a definition using a copy of the parser with its own scope
+        # and tracked variables. The copy shares the result cache, which is
+        # synchronized, and the compiled cache, which is not used for trees.
+        parser = copy.copy(self._parser)
+        parser.variables = scope
+        return parser.parse(self._trees[name], filename=self._filename(name))
+
+    @staticmethod
+    def _filename(name):
+        return '<{}>'.format(name)
@@ -0,0 +1,163 @@
+"""
+Cache of expression results keyed on the values of the variables they read.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+from collections import OrderedDict
+import threading
+import time
+
+class Result_Cache(object):
+    """
+    Bounded least-recently-used cache of expression results, which can be
+    passed to an `Expression_Parser` using its `result_cache` argument.
+
+    Results are keyed on the expression and the values of exactly the
+    variables that the expression may read. Expressions are only cached if
+    they contain no assignments and only call the predefined functions or
+    custom functions whose names are in `pure_functions`, and if the values
+    of the variables they read are hashable. Errors are never cached.
+
+    At most `max_size` results are kept. If `ttl` is provided, then results
+    expire after that number of seconds. A cache should only be used by
+    parsers that have the same functions. The cache may be shared between
+    parsers in multiple threads.
+    """
+
+    # Statistics that are counted while the cache is used
+    _counters = ('hits', 'misses', 'evictions', 'expirations')
+
+    def __init__(self, max_size=1024, ttl=None, pure_functions=()):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._pure_functions = frozenset(pure_functions)
+
+        self._plans = OrderedDict()
+        self._results = OrderedDict()
+        self._stats = dict.fromkeys(self._counters, 0)
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """
+        Retrieve a dictionary of statistics about the cache, containing the
+        number of `hits`, `misses`, `evictions` and `expirations` and the
+        current `size` of the cache.
+        """
+
+        with self._lock:
+            stats = self._stats.copy()
+            stats['size'] = len(self._results)
+
+        return stats
+
+    def clear(self):
+        """
+        Remove all results and statistics from the cache.
+        """
+
+        with self._lock:
+            self._plans.clear()
+            self._results.clear()
+            self._stats = dict.fromkeys(self._counters, 0)
+
+    def plan(self, parser, expression):
+        """
+        Retrieve the plan for caching results of the `expression`, which is
+        either a string or a syntax tree returned by `parser.compile`.
+
+        Returns a tuple of a key for the expression, its syntax tree, and the
+        sorted names of the variables it reads. The names are `None` if the
+        results of the expression cannot be cached.
+        """
+
+        # Syntax trees are hashed by identity and are kept alive by the keys.
+        key = expression
+        with self._lock:
+            if key in self._plans:
+                return self._plans[key]
+
+        if isinstance(expression, ast.AST):
+            tree = expression
+        else:
+            tree = parser.compile(expression)
+
+        if self._is_cacheable(parser, tree):
+            names = tuple(sorted(parser.find_variables(tree)))
+        else:
+            names = None
+
+        plan = (key, tree, names)
+        with self._lock:
+            if key not in self._plans and len(self._plans) >= self._max_size:
+                self._plans.popitem(last=False)
+
+            self._plans[key] = plan
+
+        return plan
+
+    def _is_cacheable(self, parser, tree):
+        functions = parser.functions
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Assign, ast.AugAssign)):
+                return False
+            if isinstance(node, ast.Call):
+                name = node.func.id
+                if name in functions and name not in self._pure_functions:
+                    return False
+
+        return True
+
+    def get(self, key):
+        """
+        Retrieve the cached entry for the `key`, which is a tuple of the
+        result and the names of the used variables, or `None` if there is
+        no such entry.
+        """
+
+        with self._lock:
+            entry = self._results.pop(key, None)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            result, used_variables, timestamp = entry
+            if self._ttl is not None and time.time() - timestamp > self._ttl:
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            # Move the entry to the most recently used position.
+            self._results[key] = entry
+            self._stats['hits'] += 1
+
+        return result, used_variables
+
+    def put(self, key, result, used_variables):
+        """
+        Store the `result` of an expression and the names of the
+        `used_variables` under the `key`.
+        """
+
+        entry = (result, frozenset(used_variables), time.time())
+        with self._lock:
+            if key not in self._results and \
+                    len(self._results) >= self._max_size:
+                self._results.popitem(last=False)
+                self._stats['evictions'] += 1
+
+            self._results[key] = entry
@@ -0,0 +1,262 @@
+"""
+Index for matching many boolean filter expressions against records.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import bisect
+import math
+from .nodes import expression_node, is_literal, is_signed_literal, signed_literal_value
+from .parser import Expression_Error, Expression_Parser
+
+class Rule_Index(object):
+    """
+    Index of boolean filter rules, which finds the rules that match a record
+    without evaluating every rule.
+
+    Each rule is indexed on one comparison between a variable and a literal
+    number in its top-level `and` conjunction, such as `amount > 500`. Equality tests are kept in
+    hash buckets and range tests in sorted lists of bounds, such that only
+    rules whose indexed comparison holds for the record are evaluated fully.
+    Rules without such a comparison are always evaluated. Rules that raise
+    an error for a record do not match it.
+
+    The rules are compiled using `parser`, or a default expression parser.
+    """
+
+    # Comparison operators after swapping the operands
+    _swapped_ops = {
+        ast.Eq: ast.Eq,
+        ast.Lt: ast.Gt,
+        ast.LtE: ast.GtE,
+        ast.Gt: ast.Lt,
+        ast.GtE: ast.LtE
+    }
+
+    # Range comparison operators that provide a lower or upper bound, and
+    # whether the bound itself is excluded
+    _lower_ops = {ast.Gt: True, ast.GtE: False}
+    _upper_ops = {ast.Lt: True, ast.LtE: False}
+
+    def __init__(self, parser=None):
+        if parser is None:
+            parser = Expression_Parser()
+
+        self._parser = parser
+        self._rules = {}
+
+        # Exact rules are fully described by their indexed comparison.
+        self._exact = set()
+        self._fallback = []
+        self._equality = {}
+
+        # Range rules are kept by variable name and whether the comparison
+        # provides a lower bound, in a list of sorted bounds and a list of
+        # tuples of the bound, whether it is excluded and the rule.
+        self._ranges = {}
+        self._sorted = True
+
+    def __len__(self):
+        return len(self._rules)
+
+    def add(self, rule_id, expression):
+        """
+        Add a rule with a hashable `rule_id` and a boolean `expression`, which
+        is either a string or a syntax tree returned by `compile`.
+        """
+
+        if rule_id in self._rules:
+            raise KeyError('Rule {!r} is already in the index'.format(rule_id))
+
+        if isinstance(expression, ast.AST):
+            tree = expression
+        else:
+            tree = self._parser.compile(expression)
+
+        self._rules[rule_id] = tree
+        conjuncts = self._conjuncts(tree)
+        comparisons = []
+        for conjunct in conjuncts:
+            comparisons.extend(self._comparisons(conjunct))
+
+        if not comparisons:
+            self._fallback.append(rule_id)
+            return
+
+        equalities = [item for item in comparisons if item[1] is ast.Eq]
+        if equalities:
+            name, _, value = equalities[0]
+            bucket = self._equality.setdefault(name, {})
+            bucket.setdefault(value, []).append(rule_id)
+        else:
+            name, op, value = comparisons[0]
+            lower = op in self._lower_ops
+            if lower:
+                strict = self._lower_ops[op]
+            else:
+                strict = self._upper_ops[op]
+
+            bounds = self._ranges.setdefault((name, lower), ([], []))
+            bounds[1].append((value, strict, rule_id))
+            self._sorted = False
+
+        if len(conjuncts) == 1:
+            self._exact.add(rule_id)
+
+    @staticmethod
+    def _conjuncts(tree):
+        node = expression_node(tree)
+        if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+            conjuncts = []
+            for value in node.values:
+                conjuncts.extend(Rule_Index._conjuncts(value))
+
+            return conjuncts
+
+        return [node]
+
+    def _comparisons(self, node):
+        # Extract an indexable comparison between a variable and a number as
+        # a tuple of the name, operator and number. Chained comparisons are
+        # evaluated by comparing the result of the previous operator, so they
+        # do not constrain the variable.
+        if not isinstance(node, ast.Compare) or len(node.ops) != 1:
+            return []
+
+        left = node.left
+        right = node.comparators[0]
+        op = type(node.ops[0])
+        if op not in self._swapped_ops:
+            return []
+
+        if self._is_variable(right) and not self._is_variable(left):
+            left, right = right, left
+            op = self._swapped_ops[op]
+
+        if not self._is_variable(left) or not is_signed_literal(right):
+            return []
+
+        value = signed_literal_value(right)
+        if op is ast.Eq:
+            if self._is_hashable(value):
+                return [(left.id, op, value)]
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            return [(left.id, op, value)]
+
+        return []
+
+    @staticmethod
+    def _is_variable(node):
+        return isinstance(node, ast.Name) and not is_literal(node)
+
+    @staticmethod
+    def _is_hashable(value):
+        try:
+            hash(value)
+        except TypeError:
+            return False
+
+        return True
+
+    def _sort(self):
+        for bounds in self._ranges.values():
+            bounds[1].sort(key=lambda item: item[0])
+            bounds[0][:] = [item[0] for item in bounds[1]]
+
+        self._sorted = True
+
+    def candidates(self, record):
+        """
+        Retrieve the identifiers of the rules that may match the dictionary
+        `record`, as a tuple of a list of identifiers that are known to match
+        and a list of identifiers that must be evaluated.
+        """
+
+        if not self._sorted:
+            self._sort()
+
+        matches = []
+        candidates = list(self._fallback)
+        for name, buckets in self._equality.items():
+            if name not in record:
+                continue
+
+            try:
+                rule_ids = buckets.get(record[name], ())
+            except TypeError:
+                continue
+
+            for rule_id in rule_ids:
+                if rule_id in self._exact:
+                    matches.append(rule_id)
+                else:
+                    candidates.append(rule_id)
+
+        for (name, lower), bounds in self._ranges.items():
+            if name not in record:
+                continue
+
+            rule_ids, known = self._range_rules(record[name], bounds, lower)
+            for rule_id in rule_ids:
+                if known and rule_id in self._exact:
+                    matches.append(rule_id)
+                else:
+                    candidates.append(rule_id)
+
+        return matches, candidates
+
+    @staticmethod
+    def _range_rules(value, bounds, lower):
+        # Retrieve the identifiers of the range rules whose bound may hold for
+        # the value, and whether the bounds are known to hold.
+        if isinstance(value, float) and math.isnan(value):
+            # Not a number never satisfies a range comparison.
+            return [], True
+
+        keys, items = bounds
+        try:
+            if lower:
+                selected = items[:bisect.bisect_right(keys, value)]
+            else:
+                selected = items[bisect.bisect_left(keys, value):]
+        except (TypeError, ArithmeticError):
+            # Incomparable values are left to the full evaluation.
+            return [item[2] for item in items], False
+
+        rule_ids = [
+            rule_id for bound, strict, rule_id in selected
+            if not strict or bound != value
+        ]
+        return rule_ids, True
+
+    def match(self, record):
+        """
+        Retrieve the set of identifiers of the rules that match the dictionary
+        `record`, which provides the variables of the rules.
+        """
+
+        matches, candidates = self.candidates(record)
+        result = set(matches)
+        if not candidates:
+            return result
+
+        self._parser.variables = record
+        for rule_id in candidates:
+            value = self._parser.parse(self._rules[rule_id], raise_errors=False)
+            if value and not isinstance(value, Expression_Error):
+                result.add(rule_id)
+
+        return result
@@ -0,0 +1,278 @@
+"""
+Translation of expressions into parameterized SQL conditions.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+from .nodes import expression_node, is_literal, is_literal_value, literal_value, make_module
+from .parser import Expression_Error
+
+class SQL_Translator(object):
+    """
+    Translator of validated expression syntax trees, as returned by
+    `Expression_Parser.compile`, into SQL `WHERE` conditions with `?`
+    placeholders for bound parameters.
+
+    Variables refer to columns, which are double-quoted identifiers unless
+    `columns` maps the variable name to a trusted SQL expression. Variables
+    in the `variables` dictionary are bound as parameters instead. Function
+    calls are only translated if `functions` maps their names to SQL function
+    names.
+
+    The translation assumes numeric columns: Python truth values of numbers
+    become comparisons with zero and division is performed on floating point
+    numbers. Unlike Python, SQL yields `NULL` instead of raising an error for
+    comparisons with `NULL` and division by zero, which excludes the row.
+    Parts that have no portable translation, such as chained comparisons,
+    containment tests, bitwise and modulo operators, raise an
+    `Expression_Error` of the kind `ValueError` with the offending node.
+    """
+
+    # Binary operators
+    _binary_ops = {
+        ast.Add: '+',
+        ast.Sub: '-',
+        ast.Mult: '*',
+        ast.Div: '/'
+    }
+
+    # Unary operators on values
+    _unary_ops = {
+        ast.UAdd: '+',
+        ast.USub: '-'
+    }
+
+    # Comparison operators, and their translation when comparing to `None`
+    _compare_ops = {
+        ast.Eq: '=',
+        ast.NotEq: '<>',
+        ast.Lt: '<',
+        ast.LtE: '<=',
+        ast.Gt: '>',
+        ast.GtE: '>='
+    }
+    _null_ops = {
+        ast.Eq: 'IS NULL',
+        ast.Is: 'IS NULL',
+        ast.NotEq: 'IS NOT NULL',
+        ast.IsNot: 'IS NOT NULL'
+    }
+
+    # Boolean operators
+    _boolean_ops = {
+        ast.And: 'AND',
+        ast.Or: 'OR'
+    }
+
+    def __init__(self, columns=None, variables=None, functions=None):
+        self._columns = {} if columns is None else columns
+        self._variables = {} if variables is None else variables
+        self._functions = {} if functions is None else functions
+        self._params = []
+
+    def translate(self, tree):
+        """
+        Translate the syntax tree `tree` into a SQL condition.
+
+        Returns a tuple of the SQL string and a list of parameters. If any part
+        of the expression cannot be translated, then an `Expression_Error` is
+        raised.
+        """
+
+        self._params = []
+        sql = self._condition(expression_node(tree))
+        return sql, self._params
+
+    def split(self, tree):
+        """
+        Split the top-level `and` conjunction of the syntax tree `tree` into
+        parts that can be translated to SQL and a residual expression.
+
+        Returns a tuple of the SQL string, a list of parameters and a syntax
+        tree of the residual expression. The SQL string is `None` if no part
+        can be translated, and the residual tree is `None` if the entire
+        expression is translated. Rows that match the SQL condition must be
+        filtered further by evaluating the residual expression.
+        """
+
+        node = expression_node(tree)
+        if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+            conjuncts = node.values
+        else:
+            conjuncts = [node]
+
+        conditions = []
+        params = []
+        residual = []
+        for conjunct in conjuncts:
+            # Any part that fails to translate is evaluated by the residual
+            # expression instead, which reports its errors when it is parsed.
+            # pylint: disable=broad-except
+            try:
+                sql, conjunct_params = self.translate(conjunct)
+            except Exception:
+                residual.append(conjunct)
+            else:
+                conditions.append(sql)
+                params.extend(conjunct_params)
+
+        if not conditions:
+            return None, [], tree
+
+        if len(conditions) == 1:
+            sql = conditions[0]
+        else:
+            sql = ' AND '.join('({})'.format(condition)
+                               for condition in conditions)
+
+        return sql, params, self._residual(residual)
+
+    @staticmethod
+    def _residual(conjuncts):
+        if not conjuncts:
+            return None
+
+        if len(conjuncts) == 1:
+            value = conjuncts[0]
+        else:
+            value = ast.BoolOp(op=ast.And(), values=conjuncts)
+
+        module = make_module(ast.Expr(value=value))
+        return ast.fix_missing_locations(ast.copy_location(module, value))
+
+    @staticmethod
+    def _error(node, template, name=None):
+        return Expression_Error('ValueError', template, node, name=name)
+
+    def _literal(self, node, value):
+        if value is None:
+            return 'NULL'
+        if isinstance(value, complex):
+            raise self._error(node, 'Complex number cannot be translated to SQL')
+
+        self._params.append(value)
+        return '?'
+
+    def _condition(self, node):
+        # Translate a node whose truth value is used.
+        if isinstance(node, ast.BoolOp):
+            op = self._boolean_ops[type(node.op)]
+            return ' {} '.format(op).join('({})'.format(self._condition(value))
+                                          for value in node.values)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return 'NOT ({})'.format(self._condition(node.operand))
+        if isinstance(node, ast.Compare):
+            return self._compare(node)
+        if isinstance(node, ast.IfExp):
+            return 'CASE WHEN {} THEN {} ELSE {} END'.format(
+                self._condition(node.test), self._condition(node.body),
+                self._condition(node.orelse)
+            )
+        if is_literal(node) and literal_value(node) is None:
+            return 'NULL'
+
+        return '{} <> 0'.format(self._value(node))
+
+    def _value(self, node):
+        # Translate a node whose value is used.
+        # pylint: disable=too-many-return-statements
+        if is_literal(node):
+            return self._literal(node, literal_value(node))
+        if isinstance(node, ast.Name):
+            return self._name(node)
+        if isinstance(node, ast.BinOp) and type(node.op) in self._binary_ops:
+            left = self._value(node.left)
+            if isinstance(node.op, ast.Div):
+                left = 'CAST({} AS REAL)'.format(left)
+
+            return '({} {} {})'.format(left, self._binary_ops[type(node.op)],
+                                       self._value(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in self._unary_ops:
+            return '{}({})'.format(self._unary_ops[type(node.op)],
+                                   self._value(node.operand))
+        if isinstance(node, ast.Compare) or \
+                isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            # Truth values are integers, like booleans in Python arithmetic.
+            return 'CASE WHEN {} THEN 1 ELSE 0 END'.format(self._condition(node))
+        if isinstance(node, ast.IfExp):
+            return 'CASE WHEN {} THEN {} ELSE {} END'.format(
+                self._condition(node.test), self._value(node.body),
+                self._value(node.orelse)
+            )
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        if isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            raise self._error(node, "Operator '{}' cannot be translated to SQL",
+                              name=node.op.__class__.__name__)
+
+        # Boolean operations return one of their operands, which SQL cannot.
+        raise self._error(node, 'Node {} cannot be translated to SQL',
+                          name=node.__class__.__name__)
+
+    def _name(self, node):
+        if node.id in self._variables:
+            value = self._variables[node.id]
+            if not is_literal_value(value):
+                raise self._error(node, "Variable '{}' cannot be translated to SQL",
+                                  name=node.id)
+
+            return self._literal(node, value)
+
+        if node.id in self._columns:
+            return self._columns[node.id]
+
+        return '"{}"'.format(node.id.replace('"', '""'))
+
+    def _compare(self, node):
+        if len(node.ops) != 1:
+            raise self._error(node, 'Chained comparisons cannot be translated to SQL')
+
+        op = type(node.ops[0])
+        left = node.left
+        right = node.comparators[0]
+        if op in self._null_ops:
+            if self._is_none(left):
+                left, right = right, left
+            if self._is_none(right):
+                return '{} {}'.format(self._value(left), self._null_ops[op])
+
+        if op not in self._compare_ops:
+            raise self._error(node, "Operator '{}' cannot be translated to SQL",
+                              name=op.__name__)
+
+        return '{} {} {}'.format(self._value(left), self._compare_ops[op],
+                                 self._value(right))
+
+    def _is_none(self, node):
+        if is_literal(node):
+            return literal_value(node) is None
+        if isinstance(node, ast.Name) and node.id in self._variables:
+            return self._variables[node.id] is None
+
+        return False
+
+    def _call(self, node):
+        name = node.func.id
+        if name not in self._functions:
+            raise self._error(node, "Function '{}' cannot be translated to SQL",
+                              name=name)
+        if node.keywords:
+            raise self._error(node,
+                              "Keyword arguments of function '{}' cannot be "
+                              "translated to SQL", name=name)
+
+        arguments = ', '.join(self._value(arg) for arg in node.args)
+        return '{}({})'.format(self._functions[name], arguments)
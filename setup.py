@@ -34,7 +34,10 @@ custom variable and function environment contexts.''',
       license='Apache License, Version 2.0',
       packages=find_packages(exclude=['tests*']),
       entry_points={
-          'console_scripts': ['expression = expression.interpreter:main']
+          'console_scripts': [
+              'expression = expression.interpreter:main',
+              'expression-batch = expression.batch:main'
+          ]
       },
       include_package_data=True,
       install_requires=[],
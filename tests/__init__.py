@@ -18,6 +18,9 @@ limitations under the License.
 
 __all__ = ['Expression_Parser_Test']
 
+import os
+import shutil
+import tempfile
 import unittest
 import expression
 
@@ -328,6 +331,13 @@ class Expression_Parser_Test(unittest.TestCase):
         self.parser.variables = {'x': 42, 'y': 1.3}
         self.assertEqual(self.parser.variables, {'x': 42, 'y': 1.3})
 
+        self.parser.update_variables({'y': 2, 'z': 3})
+        self.assertEqual(self.parser.variables, {'x': 42, 'y': 2, 'z': 3})
+        with self.assertRaisesError('Cannot override keyword None',
+                                    exception=NameError):
+            self.parser.update_variables({'None': 1, 'w': 4})
+        self.assertNotIn('w', self.parser.variables)
+
     def test_assignment(self):
         """
         Test assignment property and parsing.
@@ -370,3 +380,143 @@ class Expression_Parser_Test(unittest.TestCase):
         self.assertEqual(self.parser.used_variables, set())
         self.parser.parse('data')
         self.assertEqual(self.parser.used_variables, set(['data']))
+
+    def test_compile(self):
+        """
+        Test compiling an expression and evaluating the syntax tree.
+        """
+
+        tree = self.parser.compile('square(len) + 1')
+        self.parser.variables = {'len': 3}
+        self.assertEqual(self.parser.parse(tree), 10)
+        self.assertEqual(self.parser.used_variables, set(['len']))
+        self.parser.variables = {'len': 4}
+        self.assertEqual(self.parser.parse(tree), 17)
+
+        with self.assertRaisesError(r"Node .* not allowed"):
+            self.parser.compile('[1, 2]')
+        with self.assertRaisesError("Exactly one expression must be provided"):
+            self.parser.compile('1;2')
+        with self.assertRaisesError("Assignments are not allowed"):
+            self.parser.compile('a = 1')
+        with self.assertRaisesError("Only named functions can be called"):
+            self.parser.compile('square(1)(2) > 0 and len > 1')
+        with self.assertRaisesError(r"Node .* not allowed"):
+            self.parser.compile('len == "abc"')
+
+        # Names are only resolved when the tree is evaluated.
+        tree = self.parser.compile('undefined')
+        with self.assertRaisesError("NameError: Name 'undefined' is not defined"):
+            self.parser.parse(tree)
+
+    def test_cache_dir(self):
+        """
+        Test storing compiled expressions in a cache directory.
+        """
+
+        self.assertIsNone(self.parser.cache_dir)
+
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+
+        parser = expression.Expression_Parser(variables={'x': 2},
+                                              cache_dir=cache_dir)
+        self.assertEqual(parser.cache_dir, cache_dir)
+        self.assertEqual(parser.parse('x * 3'), 6)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+        # Another parser with the same configuration reads the cache entry.
+        other = expression.Expression_Parser(variables={'x': 4},
+                                             cache_dir=cache_dir)
+        tree = other.compile('x * 3')
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertEqual(other.parse(tree), 12)
+
+        # A different configuration uses separate entries.
+        other.assignment = True
+        other.compile('x * 3')
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+        with self.assertRaisesError(r"Node .* not allowed"):
+            parser.parse('x[0]')
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+        # Entries are validated again when they are read.
+        for entry in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, entry)
+            with open(path) as entry_file:
+                contents = entry_file.read()
+            with open(path, 'w') as entry_file:
+                entry_file.write(contents.replace('"Mult"', '"MatMult"'))
+
+        other = expression.Expression_Parser(variables={'x': 4},
+                                             cache_dir=cache_dir)
+        with self.assertRaisesError(r"Operator .* not allowed"):
+            other.compile('x * 3')
+
+        # Trees that are kept in memory are not read again.
+        self.assertEqual(parser.parse(parser.compile('x * 3')), 6)
+
+    def test_cache_dir_permissions(self):
+        """
+        Test refusing cache directories that other users can write to.
+        """
+
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+
+        new_dir = os.path.join(cache_dir, 'cache')
+        expression.Expression_Parser(cache_dir=new_dir)
+        self.assertEqual(os.stat(new_dir).st_mode & 0o077, 0)
+
+        os.chmod(cache_dir, 0o777)
+        with self.assertRaises(ValueError):
+            expression.Expression_Parser(cache_dir=cache_dir)
+
+    def test_errors(self):
+        """
+        Test returning structured errors instead of raising them.
+        """
+
+        error = self.parser.parse('1 + missing', raise_errors=False)
+        self.assertIsInstance(error, expression.Expression_Error)
+        self.assertEqual(error.kind, 'NameError')
+        self.assertEqual(error.name, 'missing')
+        self.assertEqual((error.lineno, error.col_offset), (1, 4))
+        self.assertEqual(error.message, "Name 'missing' is not defined")
+        self.assertEqual(str(error), "Name 'missing' is not defined")
+
+        syntax_error = error.syntax_error()
+        self.assertIsInstance(syntax_error, SyntaxError)
+        self.assertEqual(syntax_error.msg,
+                         "NameError: Name 'missing' is not defined")
+        self.assertEqual(syntax_error.text, '1 + missing')
+        self.assertEqual(syntax_error.filename, '<expression>')
+
+        error = self.parser.parse('1 / 0', raise_errors=False)
+        self.assertEqual(error.kind, 'ZeroDivisionError')
+        self.assertIsNone(error.name)
+
+        error = self.parser.parse('[data]', filename='list.expr',
+                                  raise_errors=False)
+        self.assertEqual(error.kind, 'SyntaxError')
+        self.assertTrue(error.message.startswith("Node "))
+        self.assertEqual(error.syntax_error().filename, 'list.expr')
+
+        error = self.parser.parse('1 +', raise_errors=False)
+        self.assertEqual(error.kind, 'SyntaxError')
+        self.assertIsInstance(error.syntax_error(), SyntaxError)
+
+        self.assertEqual(self.parser.parse('1 + 1', raise_errors=False), 2)
+
+    def test_find_variables(self):
+        """
+        Test finding the variables that an expression may read.
+        """
+
+        self.parser.assignment = True
+        tree = self.parser.compile('a = square(b, y=c) if d else True')
+        self.assertEqual(self.parser.find_variables(tree),
+                         set(['b', 'c', 'd']))
+        tree = self.parser.compile('a += b')
+        self.assertEqual(self.parser.find_variables(tree), set(['a', 'b']))
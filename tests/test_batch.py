@@ -0,0 +1,151 @@
+"""
+Tests for the batch evaluator.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from io import StringIO
+from expression import batch
+
+class Batch_Evaluator_Test(unittest.TestCase):
+    """
+    Tests for the batch evaluator.
+    """
+
+    def _run(self, argv, lines):
+        stdout = StringIO()
+        stderr = StringIO()
+        args = batch.parse_args(argv + ['--quiet'])
+        errors = batch.run(args, StringIO(u''.join(lines)), stdout, stderr)
+        return errors, stdout.getvalue(), stderr.getvalue()
+
+    def test_evaluate(self):
+        """
+        Test evaluating named expressions for a single record.
+        """
+
+        evaluator = batch.Batch_Evaluator([('c', 'a * 2'), ('d', 'c + 1')])
+        self.assertEqual(evaluator.names, ['c', 'd'])
+        self.assertEqual(evaluator.evaluate({'a': 2}),
+                         ({'a': 2, 'c': 4, 'd': 5}, None))
+
+        output, error = evaluator.evaluate({'b': 2})
+        self.assertEqual(output, {'b': 2, 'c': None, 'd': None})
+        self.assertEqual(error.kind, 'NameError')
+        self.assertEqual(error.name, 'a')
+        self.assertEqual(error.message, "Name 'a' is not defined")
+
+    def test_json_lines(self):
+        """
+        Test evaluating a JSON lines stream.
+        """
+
+        lines = ['{"a": 1, "b": 2}\n', '\n', '{"a": 3, "b": 0}\n']
+        errors, output, _ = self._run(['a / b'], lines)
+        self.assertEqual(errors, 1)
+        self.assertEqual([json.loads(line) for line in output.splitlines()],
+                         [{'a': 1, 'b': 2, 'result': 0.5}])
+
+        errors, output, _ = self._run(['a / b', '--errors', 'keep',
+                                       '--name', 'ratio'], lines)
+        self.assertEqual(errors, 1)
+        records = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(records[1]['ratio'], None)
+        self.assertEqual(records[1]['error'],
+                         'ZeroDivisionError: division by zero')
+
+    def test_csv(self):
+        """
+        Test evaluating a CSV stream.
+        """
+
+        lines = ['a,b\n', '1,2.5\n', '2,x\n', '3,4\n']
+        errors, output, _ = self._run(['a - b', '--format', 'csv',
+                                       '--errors', 'stop'], lines)
+        self.assertEqual(errors, 1)
+        self.assertEqual(output.splitlines(), ['a,b,result', '1,2.5,-1.5'])
+
+    def test_malformed_json(self):
+        """
+        Test reporting malformed JSON lines as record errors.
+        """
+
+        lines = ['{"a": 1}\n', '[1]\n', '5\n', '{"a":\n', '{"a": 2}\n']
+        errors, output, _ = self._run(['a + 1'], lines)
+        self.assertEqual(errors, 3)
+        self.assertEqual([json.loads(line) for line in output.splitlines()],
+                         [{'a': 1, 'result': 2}, {'a': 2, 'result': 3}])
+
+        errors, output, _ = self._run(['a + 1', '--errors', 'keep'], lines)
+        self.assertEqual(errors, 3)
+        records = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[1], {
+            'result': None,
+            'error': 'TypeError: Record must be an object, not list'
+        })
+        self.assertTrue(records[3]['error'].startswith('ValueError: Invalid JSON'))
+
+        errors, output, stderr = self._run(['a + 1', '--errors', 'stop'], lines)
+        self.assertEqual(errors, 1)
+        self.assertEqual([json.loads(line) for line in output.splitlines()],
+                         [{'a': 1, 'result': 2}])
+        self.assertIn('Record 2: TypeError', stderr)
+
+    def test_malformed_csv(self):
+        """
+        Test reporting CSV rows with missing or extra fields as record errors.
+        """
+
+        lines = ['a,b\n', '1\n', '2,3\n', '4,5,6\n']
+        errors, output, _ = self._run(['a + 1', '--format', 'csv'], lines)
+        self.assertEqual(errors, 2)
+        self.assertEqual(output.splitlines(), ['a,b,result', '2,3,3'])
+
+        errors, output, _ = self._run(['a + 1', '--format', 'csv',
+                                       '--errors', 'keep'], lines)
+        self.assertEqual(errors, 2)
+        self.assertEqual(output.splitlines(), [
+            'a,b,result,error',
+            ',,,ValueError: Row has 1 fields instead of 2',
+            '2,3,3,',
+            ',,,ValueError: Row has 3 fields instead of 2'
+        ])
+
+    def test_file(self):
+        """
+        Test reading named expressions from a file.
+        """
+
+        handle, filename = tempfile.mkstemp()
+        self.addCleanup(os.remove, filename)
+        with os.fdopen(handle, 'w') as definitions:
+            definitions.write('# Totals\ntotal = price * amount\n\n')
+            definitions.write('discounted = total * 0.5\n')
+
+        self.assertEqual(batch.read_expressions(filename),
+                         [('total', 'price * amount'),
+                          ('discounted', 'total * 0.5')])
+
+        errors, output, _ = self._run(['--file', filename, '--jobs', '2'],
+                                      ['{"price": 4, "amount": 2}\n'])
+        self.assertEqual(errors, 0)
+        self.assertEqual(json.loads(output),
+                         {'price': 4, 'amount': 2, 'total': 8,
+                          'discounted': 4.0})
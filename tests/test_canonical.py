@@ -0,0 +1,88 @@
+"""
+Tests for canonical forms of expressions.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+import expression
+
+class Expression_Canonicalizer_Test(unittest.TestCase):
+    """
+    Tests for the expression canonicalizer.
+    """
+
+    def setUp(self):
+        super(Expression_Canonicalizer_Test, self).setUp()
+        self.parser = expression.Expression_Parser(assignment=True)
+        self.canonicalizer = expression.Expression_Canonicalizer()
+        self.commutative = expression.Expression_Canonicalizer(commutative=True)
+
+    def _canonical(self, text, commutative=False):
+        canonicalizer = self.commutative if commutative else self.canonicalizer
+        return canonicalizer.canonicalize(self.parser.compile(text))
+
+    def test_canonicalize(self):
+        """
+        Test creating canonical forms that retain the operand order.
+        """
+
+        self.assertEqual(self._canonical('( a+b )*  c'), '(a + b) * c')
+        self.assertEqual(self._canonical('a + (b * c)'), 'a + (b * c)')
+        self.assertEqual(self._canonical('b + a'), 'b + a')
+        self.assertEqual(self._canonical('x and (y and z)'), 'x and y and z')
+        self.assertEqual(self._canonical('not (x < 1 <= y)'),
+                         'not (x < 1 <= y)')
+        self.assertEqual(self._canonical('1 if x else -2.5'),
+                         '1 if x else (-2.5)')
+        self.assertEqual(self._canonical('f(1, z=2, y=x)'), 'f(1, y=x, z=2)')
+        self.assertEqual(self._canonical('a  +=  1'), 'a += 1')
+        self.assertEqual(self._canonical('x is None'), 'x is None')
+
+        # The canonical form can be parsed again.
+        for text in ('(a + b) * -c', 'x ** -1', 'a = b if c else d'):
+            canonical = self._canonical(text)
+            self.assertEqual(self._canonical(canonical), canonical)
+
+    def test_commutative(self):
+        """
+        Test creating canonical forms that sort commutative operands.
+        """
+
+        self.assertEqual(self._canonical('b + a', True),
+                         self._canonical('a + b', True))
+        self.assertEqual(self._canonical('(c * 2) + (a + b)', True),
+                         self._canonical('a + (b + 2 * c)', True))
+        self.assertEqual(self._canonical('y and x', True), 'x and y')
+        self.assertEqual(self._canonical('x > 5', True), '5 < x')
+        self.assertEqual(self._canonical('5 == x', True),
+                         self._canonical('x == 5', True))
+
+        # Operands with function calls keep their order.
+        self.assertEqual(self._canonical('f(b) + a', True), 'f(b) + a')
+        self.assertEqual(self._canonical('a - b', True), 'a - b')
+
+    def test_fingerprint(self):
+        """
+        Test creating stable hashes of canonical forms.
+        """
+
+        first = self.commutative.fingerprint(self.parser.compile('a+b > 3'))
+        second = self.commutative.fingerprint(self.parser.compile('3 < (b + a)'))
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 64)
+        self.assertNotEqual(first, self.canonicalizer.fingerprint(
+            self.parser.compile('3 < (b + a)')
+        ))
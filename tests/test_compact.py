@@ -0,0 +1,125 @@
+"""
+Tests for compact storage of expressions.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import threading
+import unittest
+import expression
+
+class Compact_Expression_Test(unittest.TestCase):
+    """
+    Tests for compact expressions.
+    """
+
+    expressions = [
+        'a + b * 2',
+        '1 if x > 0.5 else -1',
+        'not (x < y <= 3) or y is None',
+        'square(a, y=b)',
+        'x in data and (a ^ b) // 2 >= 1',
+        'c = a ** 2',
+        'a += 1.5'
+    ]
+
+    def setUp(self):
+        super(Compact_Expression_Test, self).setUp()
+        self.parser = expression.Expression_Parser(
+            variables={'a': 3, 'b': 4, 'x': 1, 'y': 2, 'data': [1]},
+            functions={'square': lambda x, y=2: x ** y},
+            assignment=True
+        )
+        self.table = expression.Compact_Table()
+
+    def test_roundtrip(self):
+        """
+        Test converting syntax trees to compact expressions and back.
+        """
+
+        for text in self.expressions:
+            tree = self.parser.compile(text)
+            compact = expression.Compact_Expression(tree, self.table)
+            result = compact.tree()
+            self.assertEqual(ast.dump(result), ast.dump(tree), msg=text)
+            for original, node in zip(ast.walk(tree), ast.walk(result)):
+                if isinstance(original, (ast.expr, ast.stmt)):
+                    self.assertEqual((node.lineno, node.col_offset),
+                                     (original.lineno, original.col_offset),
+                                     msg=text)
+
+            result = compact.evaluate(self.parser)
+            modified_variables = self.parser.modified_variables
+            self.assertEqual(result, self.parser.parse(tree), msg=text)
+            self.assertEqual(modified_variables,
+                             self.parser.modified_variables, msg=text)
+
+    def test_table(self):
+        """
+        Test interning names and constants in a shared table.
+        """
+
+        first = expression.Compact_Expression(self.parser.compile('a + 1'),
+                                              self.table)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(self.table), 2)
+        expression.Compact_Expression(self.parser.compile('a + 1.0 + 1'),
+                                      self.table)
+        self.assertEqual(len(self.table), 3)
+        self.assertIsInstance(self.table.constant(self.table.add_constant(1.0)),
+                              float)
+
+    def test_table_threads(self):
+        """
+        Test interning names and constants from multiple threads.
+        """
+
+        indexes = {}
+        def add(thread):
+            for value in range(200):
+                name = 'name_{}_{}'.format(thread, value)
+                indexes[name] = self.table.add_name(name)
+                indexes[value + thread * 1000] = \
+                    self.table.add_constant(value + thread * 1000)
+
+        threads = [threading.Thread(target=add, args=(thread,))
+                   for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for key, index in indexes.items():
+            if isinstance(key, int):
+                self.assertEqual(self.table.constant(index), key)
+            else:
+                self.assertEqual(self.table.name(index), key)
+
+    def test_errors(self):
+        """
+        Test error positions of compact expressions.
+        """
+
+        compact = expression.Compact_Expression(self.parser.compile('(a +\n missing)'),
+                                                self.table)
+        error = compact.evaluate(self.parser, raise_errors=False)
+        self.assertEqual(error.kind, 'NameError')
+        self.assertEqual((error.lineno, error.col_offset), (2, 1))
+        with self.assertRaises(SyntaxError):
+            compact.evaluate(self.parser)
+
+        with self.assertRaises(expression.Expression_Error):
+            expression.Compact_Expression(ast.parse('[a]'), self.table)
@@ -0,0 +1,96 @@
+"""
+Tests for the command line interpreter.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from expression.interpreter import Expression_Interpreter
+
+class Expression_Interpreter_Test(unittest.TestCase):
+    """
+    Tests for the command line interpreter.
+    """
+
+    def setUp(self):
+        super(Expression_Interpreter_Test, self).setUp()
+        self.interpreter = Expression_Interpreter()
+        self.interpreter.stdout = StringIO()
+
+    def _output(self, *lines):
+        self.interpreter.stdout.seek(0)
+        self.interpreter.stdout.truncate()
+        for line in lines:
+            self.interpreter.onecmd(line)
+
+        return self.interpreter.stdout.getvalue()
+
+    def test_default(self):
+        """
+        Test evaluating expressions and assignments.
+        """
+
+        self.assertEqual(self._output('x = 3', 'x += 2', 'x * 2'), '10\n')
+        self.assertEqual(self.interpreter.parser.variables, {'x': 5})
+
+        # Lines that look like commands are evaluated as expressions.
+        self.assertEqual(self._output('load = 1', 'load + x'), '6\n')
+
+    def test_vars(self):
+        """
+        Test showing used and modified variables.
+        """
+
+        self._output('x = 3')
+        self.assertEqual(self._output('y = x + 1', ':vars'),
+                         'Used: x\nModified: y = 4\n')
+
+    def test_load(self):
+        """
+        Test loading variables from a file.
+        """
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        filename = os.path.join(directory, 'variables.json')
+        with open(filename, 'w') as variables_file:
+            json.dump({'a': 1, 'b': 2}, variables_file)
+
+        self.assertEqual(self._output(':load ' + filename, 'a + b'),
+                         'Loaded 2 variables\n3\n')
+
+        with open(filename, 'w') as variables_file:
+            json.dump({'True': 1}, variables_file)
+
+        self.assertEqual(self._output(':load ' + filename),
+                         'Could not load variables: Cannot override keyword True\n')
+
+    def test_timeit(self):
+        """
+        Test timing an expression.
+        """
+
+        self._output('x = 3')
+        output = self._output(':timeit -n 10 x * 2')
+        self.assertTrue(output.startswith('10 loops, best of 3: '))
+        self.assertTrue(output.endswith(' usec per loop\n'))
+
+        self.assertEqual(self._output(':timeit -n 0 x', 'x'),
+                         'Number of loops must be a positive integer\n3\n')
@@ -0,0 +1,119 @@
+"""
+Tests for interval analysis of expressions.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import random
+import unittest
+import expression
+
+class Interval_Analyzer_Test(unittest.TestCase):
+    """
+    Tests for the interval analyzer.
+    """
+
+    def setUp(self):
+        super(Interval_Analyzer_Test, self).setUp()
+        self.parser = expression.Expression_Parser(functions={
+            'square': lambda x: x * x
+        })
+
+    def _analyze(self, text, bounds):
+        analyzer = expression.Interval_Analyzer(bounds, self.parser)
+        return analyzer.analyze(self.parser.compile(text))
+
+    def test_analyze(self):
+        """
+        Test analyzing expressions against bounds.
+        """
+
+        bounds = {'a': (10, 20), 'b': (-5, 5), 'x': (0.5, 1.5)}
+        cases = [
+            ('a > 5', True),
+            ('a > 25', False),
+            ('a > 15', None),
+            ('a + b >= 5', True),
+            ('a - b > 15', None),
+            ('a * x < 31', True),
+            ('a / x <= 40', True),
+            ('a / b > 0', None),
+            ('a // 3 == 2', False),
+            ('-b <= 5', True),
+            ('not a < 5', True),
+            ('a > 15 and b > 10', False),
+            ('a > 15 or x < 2', True),
+            ('b == 0 or b != 0', None),
+            ('a > 15 or b < 10', True),
+            ('x - 0.5 or a', True),
+            ('b or a', None),
+            ('(a if b > 10 else x) < 2', True),
+            ('(a if b > 0 else x) < 2', None),
+            ('a > 5 < 2', True),
+            ('square(a) > 0', None),
+            ('int(x) <= 1', True),
+            ('bool(a)', True),
+            ('y > 0', None),
+            ('a == 10', None),
+            ('True', True),
+            ('None', None),
+            ('a == data', None)
+        ]
+        for text, expected in cases:
+            self.assertIs(self._analyze(text, bounds), expected, msg=text)
+
+        self.assertIs(self._analyze('a == 10', {'a': (10, 10)}), True)
+        self.assertIs(self._analyze('a != 10', {'a': (10, 10)}), False)
+        self.assertIs(self._analyze('a * 2 > 0', {'a': (0, float('inf'))}),
+                      None)
+        self.assertIs(self._analyze('a > 0', {'a': (float('nan'), 1)}), None)
+        self.assertIs(self._analyze('a > 0', {'a': (1, float('nan'))}), None)
+
+    def test_soundness(self):
+        """
+        Test that definite answers hold for values within the bounds.
+        """
+
+        expressions = [
+            'a + b * x > 3',
+            'a - b < 12 and x * 2 >= 1.5',
+            'not (a / x > 20) or b // 2 == -1',
+            '(a if b < 0 else b + 18) >= 12',
+            'a - 2 * b > 5 > x',
+            'a * b > -60 or x < 1'
+        ]
+        rng = random.Random(42)
+        for _ in range(50):
+            low_a = rng.randint(0, 20)
+            low_b = rng.randint(-10, 5)
+            low_x = rng.uniform(0.1, 2)
+            bounds = {
+                'a': (low_a, low_a + rng.randint(0, 5)),
+                'b': (low_b, low_b + rng.randint(0, 5)),
+                'x': (low_x, low_x + rng.uniform(0, 1))
+            }
+            for text in expressions:
+                result = self._analyze(text, bounds)
+                if result is None:
+                    continue
+
+                for _ in range(20):
+                    self.parser.variables = {
+                        'a': rng.randint(*bounds['a']),
+                        'b': rng.randint(*bounds['b']),
+                        'x': rng.uniform(*bounds['x'])
+                    }
+                    self.assertEqual(bool(self.parser.parse(text)), result,
+                                     msg='{} {}'.format(text, bounds))
@@ -0,0 +1,102 @@
+"""
+Tests for partial evaluation of expressions.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+import expression
+
+class Expression_Specializer_Test(unittest.TestCase):
+    """
+    Tests for the expression specializer.
+    """
+
+    def setUp(self):
+        super(Expression_Specializer_Test, self).setUp()
+        self.parser = expression.Expression_Parser(functions={'f': abs})
+        self.canonicalizer = expression.Expression_Canonicalizer()
+
+    def _specialize(self, text, **variables):
+        specializer = expression.Expression_Specializer(self.parser, variables)
+        tree = self.parser.compile(text)
+        residual = specializer.specialize(tree)
+        return self.canonicalizer.canonicalize(residual)
+
+    def test_specialize(self):
+        """
+        Test substituting and folding known variables.
+        """
+
+        self.assertEqual(self._specialize('amount * rate * 2', rate=0.5),
+                         '(amount * 0.5) * 2')
+        self.assertEqual(self._specialize('amount * (rate * 2)', rate=0.5),
+                         'amount * 1.0')
+        self.assertEqual(self._specialize('-limit + f(x)', limit=3),
+                         '(-3) + f(x)')
+        self.assertEqual(self._specialize('1 < limit <= 3', limit=3), 'True')
+        self.assertEqual(self._specialize('x / zero', zero=0), 'x / 0')
+        self.assertEqual(self._specialize('1 / zero', zero=0), '1 / 0')
+        self.assertEqual(self._specialize('2 ** big', big=1000), '2 ** 1000')
+        self.assertEqual(self._specialize('x in data', data=[1]), 'x in data')
+
+    def test_function_names(self):
+        """
+        Test that function names are not replaced by variables.
+        """
+
+        parser = expression.Expression_Parser(variables={'x': 2},
+                                              functions={'rate': lambda x: x * 10})
+        specializer = expression.Expression_Specializer(parser, {'rate': 3})
+        residual = specializer.specialize(parser.compile('rate(x) + rate'))
+        self.assertEqual(self.canonicalizer.canonicalize(residual),
+                         'rate(x) + 3')
+        self.assertEqual(parser.parse(residual), 23)
+
+        residual = specializer.specialize(parser.compile('f(x=rate)'))
+        self.assertEqual(self.canonicalizer.canonicalize(residual), 'f(x=3)')
+
+    def test_prune(self):
+        """
+        Test pruning branches with constant tests.
+        """
+
+        self.assertEqual(self._specialize('a if flag else b', flag=1), 'a')
+        self.assertEqual(self._specialize('a if flag > 2 else b', flag=1), 'b')
+        self.assertEqual(self._specialize('enabled and x > t', enabled=True,
+                                          t=4), 'x > 4')
+        self.assertEqual(self._specialize('x and enabled and y',
+                                          enabled=False), 'x and False')
+        self.assertEqual(self._specialize('x and enabled', enabled=True),
+                         'x and True')
+        self.assertEqual(self._specialize('x or enabled or y', enabled=0),
+                         'x or y')
+        self.assertEqual(self._specialize('enabled or y', enabled=2), '2')
+
+    def test_evaluate(self):
+        """
+        Test evaluating residual syntax trees.
+        """
+
+        tree = self.parser.compile('amount > limit and (f(x) if strict else x)')
+        specializer = expression.Expression_Specializer(self.parser,
+                                                        {'limit': 10,
+                                                         'strict': True})
+        residual = specializer.specialize(tree)
+        self.parser.variables = {'amount': 20, 'x': -3}
+        self.assertEqual(self.parser.parse(residual), 3)
+        self.assertEqual(self.parser.used_variables, set(['amount', 'x']))
+        self.assertEqual(self.parser.parse(tree, raise_errors=False).kind,
+                         'NameError')
@@ -0,0 +1,152 @@
+"""
+Tests for programs of named expressions.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+import time
+import unittest
+import expression
+
+class Expression_Program_Test(unittest.TestCase):
+    """
+    Tests for programs of named expressions.
+    """
+
+    definitions = [
+        ('margin', 'revenue - cost'),
+        ('ratio', 'margin / revenue'),
+        ('revenue', 'price * amount'),
+        ('cost', 'amount * unit_cost'),
+        ('healthy', 'ratio > 0.2 and margin > 100')
+    ]
+
+    def test_levels(self):
+        """
+        Test ordering definitions by their dependencies.
+        """
+
+        program = expression.Expression_Program(self.definitions)
+        self.assertEqual(program.names,
+                         ['margin', 'ratio', 'revenue', 'cost', 'healthy'])
+        self.assertEqual(program.levels, [
+            ['revenue', 'cost'], ['margin'], ['ratio'], ['healthy']
+        ])
+        self.assertEqual(program.dependencies('margin'), set(['revenue', 'cost']))
+        self.assertEqual(program.dependencies('revenue'), set())
+
+    def test_run(self):
+        """
+        Test evaluating a program.
+        """
+
+        parser = expression.Expression_Parser()
+        program = expression.Expression_Program(dict(self.definitions), parser)
+        variables = {'price': 10, 'amount': 50, 'unit_cost': 6}
+        results = program.run(variables)
+        self.assertEqual(results, {
+            'revenue': 500,
+            'cost': 300,
+            'margin': 200,
+            'ratio': 0.4,
+            'healthy': True
+        })
+        self.assertEqual(parser.variables['margin'], 200)
+        self.assertEqual(parser.variables['price'], 10)
+        self.assertNotIn('margin', variables)
+
+        self.assertEqual(program.run(variables, workers=3), results)
+
+        with self.assertRaises(SyntaxError) as context:
+            program.run({'price': 10, 'amount': 50})
+
+        self.assertEqual(context.exception.filename, '<cost>')
+
+    def test_workers(self):
+        """
+        Test evaluating definitions within a level concurrently.
+        """
+
+        barrier = threading.Condition()
+        waiting = [0]
+        def fetch(key):
+            # Wait until both definitions in the level are being evaluated.
+            with barrier:
+                waiting[0] += 1
+                barrier.notify_all()
+                deadline = time.time() + 5
+                while waiting[0] < 2 and time.time() < deadline:
+                    barrier.wait(0.1)
+
+                return key * 10 if waiting[0] >= 2 else None
+
+        parser = expression.Expression_Parser(functions={'fetch': fetch})
+        program = expression.Expression_Program([
+            ('total', 'a + b'),
+            ('a', 'fetch(1)'),
+            ('b', 'fetch(2)')
+        ], parser)
+        self.assertEqual(program.run(workers=2), {'a': 10, 'b': 20, 'total': 30})
+
+    def test_result_cache(self):
+        """
+        Test sharing a result cache between concurrent definitions.
+        """
+
+        cache = expression.Result_Cache()
+        parser = expression.Expression_Parser(result_cache=cache)
+        program = expression.Expression_Program([
+            ('value_{}'.format(index), 'x * {}'.format(index))
+            for index in range(50)
+        ], parser)
+        expected = dict(('value_{}'.format(index), 2 * index)
+                        for index in range(50))
+        self.assertEqual(program.run({'x': 2}, workers=8), expected)
+        self.assertEqual(program.run({'x': 2}, workers=8), expected)
+        self.assertEqual(cache.stats, {
+            'hits': 50,
+            'misses': 50,
+            'evictions': 0,
+            'expirations': 0,
+            'size': 50
+        })
+
+    def test_errors(self):
+        """
+        Test invalid programs.
+        """
+
+        with self.assertRaises(ValueError) as context:
+            expression.Expression_Program([('a', 'b + 1'), ('a', '2')])
+
+        self.assertIn('more than once', str(context.exception))
+
+        with self.assertRaises(ValueError) as context:
+            expression.Expression_Program([
+                ('a', 'c + 1'), ('b', 'a * 2'), ('c', 'b - 1'), ('d', '1')
+            ])
+
+        self.assertIn('a -> c -> b -> a', str(context.exception))
+
+        with self.assertRaises(ValueError) as context:
+            expression.Expression_Program([('x', 'x + 1')])
+
+        self.assertIn('x -> x', str(context.exception))
+
+        with self.assertRaises(SyntaxError) as context:
+            expression.Expression_Program([('a', '[1]')])
+
+        self.assertEqual(context.exception.filename, '<a>')
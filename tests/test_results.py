@@ -0,0 +1,108 @@
+"""
+Tests for the expression result cache.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import time
+import unittest
+import expression
+
+class Result_Cache_Test(unittest.TestCase):
+    """
+    Tests for the expression result cache.
+    """
+
+    def setUp(self):
+        super(Result_Cache_Test, self).setUp()
+        self.calls = []
+        functions = {
+            'double': self._double,
+            'log': self.calls.append
+        }
+        self.cache = expression.Result_Cache(max_size=2,
+                                             pure_functions=['double'])
+        self.parser = expression.Expression_Parser(functions=functions,
+                                                   result_cache=self.cache)
+
+    def _double(self, value):
+        self.calls.append(value)
+        return value * 2
+
+    def _parse(self, text, **variables):
+        self.parser.variables = variables
+        return self.parser.parse(text)
+
+    def test_hit(self):
+        """
+        Test retrieving results for the same values of the read variables.
+        """
+
+        self.assertIs(self.parser.result_cache, self.cache)
+        self.assertEqual(self._parse('double(x) + 1', x=2, y=1), 5)
+        self.assertEqual(self._parse('double(x) + 1', x=2, y=2), 5)
+        self.assertEqual(self.parser.used_variables, set(['x']))
+        self.assertEqual(self.calls, [2])
+        self.assertEqual(self.cache.stats,
+                         {'hits': 1, 'misses': 1, 'evictions': 0,
+                          'expirations': 0, 'size': 1})
+
+        # Values of different types are cached separately.
+        self.assertEqual(self._parse('double(x) + 1', x=2.0), 5.0)
+        self.assertIsInstance(self._parse('double(x) + 1', x=2.0), float)
+        self.assertEqual(self.calls, [2, 2.0])
+
+        # Compiled syntax trees are cached as well.
+        tree = self.parser.compile('x // 2')
+        self.assertEqual(self._parse(tree, x=5), 2)
+        self.assertEqual(self._parse(tree, x=5), 2)
+        self.assertEqual(self.cache.stats['evictions'], 1)
+
+    def test_uncacheable(self):
+        """
+        Test expressions whose results are not cached.
+        """
+
+        self._parse('log(x)', x=1)
+        self._parse('log(x)', x=1)
+        self.assertEqual(self.calls, [1, 1])
+
+        self.assertEqual(self._parse('1 if x else 0', x=[1]), 1)
+        with self.assertRaises(SyntaxError):
+            self._parse('x + y', x=1)
+        self.assertEqual(self.cache.stats['size'], 0)
+
+        self.parser.assignment = True
+        self._parse('y = x', x=1)
+        self.assertEqual(self.parser.modified_variables, {'y': 1})
+        self._parse('y = x', x=1)
+        self.assertEqual(self.parser.modified_variables, {'y': 1})
+        self.assertEqual(self.cache.stats['size'], 0)
+
+    def test_ttl(self):
+        """
+        Test expiring cached results.
+        """
+
+        cache = expression.Result_Cache(ttl=0.01)
+        parser = expression.Expression_Parser(variables={'x': 1},
+                                              result_cache=cache)
+        parser.parse('x + 1')
+        time.sleep(0.02)
+        parser.parse('x + 1')
+        self.assertEqual(cache.stats['expirations'], 1)
+
+        cache.clear()
+        self.assertEqual(cache.stats['size'], 0)
@@ -0,0 +1,107 @@
+"""
+Tests for the rule index.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import itertools
+import unittest
+import expression
+
+class Rule_Index_Test(unittest.TestCase):
+    """
+    Tests for the rule index.
+    """
+
+    rules = {
+        'nl': 'country_code == 31',
+        'nl_large': 'country_code == 31 and amount > 500',
+        'large': '500 < amount',
+        'at_least': 'amount >= 100',
+        'small': 'amount <= 100',
+        'between': 'amount > 10 and amount < 20',
+        'chained': '0 < amount < 2',
+        'either': 'country_code == 31 or country_code == 32',
+        'flagged': 'flagged',
+        'none': 'country_code == None'
+    }
+
+    def setUp(self):
+        super(Rule_Index_Test, self).setUp()
+        self.index = expression.Rule_Index()
+        for rule_id, rule in self.rules.items():
+            self.index.add(rule_id, rule)
+
+    def _evaluate(self, record):
+        # Match the rules without the index.
+        parser = expression.Expression_Parser(variables=record)
+        result = set()
+        for rule_id, rule in self.rules.items():
+            value = parser.parse(rule, raise_errors=False)
+            if value and not isinstance(value, expression.Expression_Error):
+                result.add(rule_id)
+
+        return result
+
+    def test_match(self):
+        """
+        Test matching records against the rules.
+        """
+
+        self.assertEqual(len(self.index), len(self.rules))
+        self.assertEqual(self.index.match({'country_code': 31, 'amount': 600}),
+                         set(['nl', 'nl_large', 'large', 'at_least',
+                              'chained', 'either']))
+
+        codes = [31, 32, 33, None, 'x']
+        amounts = [5, 15, 20, 100, 100.0, 500, 501, float('nan'), 'y']
+        for code, amount, flagged in itertools.product(codes, amounts,
+                                                       [True, False]):
+            record = {'country_code': code, 'amount': amount,
+                      'flagged': flagged}
+            self.assertEqual(self.index.match(record), self._evaluate(record),
+                             msg=repr(record))
+
+        # Missing variables do not match.
+        self.assertEqual(self.index.match({'amount': 50}),
+                         set(['small', 'chained']))
+
+    def test_candidates(self):
+        """
+        Test that only rules that may match are evaluated.
+        """
+
+        matches, candidates = self.index.candidates({'country_code': 33,
+                                                     'amount': 15})
+        self.assertEqual(set(matches), set(['small']))
+        self.assertEqual(set(candidates),
+                         set(['between', 'chained', 'either', 'flagged']))
+
+        # Comparisons with negative numbers are indexed as well.
+        index = expression.Rule_Index()
+        index.add('negative', 'amount > -5')
+        index.add('positive', '+5 == amount')
+        self.assertEqual(index.candidates({'amount': -100}), ([], []))
+        matches, candidates = index.candidates({'amount': 5})
+        self.assertEqual(set(matches), set(['negative', 'positive']))
+        self.assertEqual(candidates, [])
+
+    def test_add(self):
+        """
+        Test adding rules with duplicate identifiers.
+        """
+
+        with self.assertRaises(KeyError):
+            self.index.add('nl', 'country_code == 31')
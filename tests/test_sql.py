@@ -0,0 +1,195 @@
+"""
+Tests for translation of expressions into SQL conditions.
+
+Copyright 2017-2018 Leon Helwerda
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import ast
+import sqlite3
+import unittest
+import expression
+
+class SQL_Translator_Test(unittest.TestCase):
+    """
+    Tests for the SQL translator.
+    """
+
+    rows = [
+        (1, 3, 4, 0.5),
+        (2, 0, 7, 2.5),
+        (3, -2, 1, 0.0),
+        (4, 5, 5, 1.5),
+        (5, 9, 2, 3.0)
+    ]
+
+    def setUp(self):
+        super(SQL_Translator_Test, self).setUp()
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute('CREATE TABLE data (id, a, b, x)')
+        self.connection.executemany('INSERT INTO data VALUES (?, ?, ?, ?)',
+                                    self.rows)
+        self.parser = expression.Expression_Parser(functions={
+            'square': lambda x: x * x,
+            'abs': abs
+        })
+
+    def tearDown(self):
+        super(SQL_Translator_Test, self).tearDown()
+        self.connection.close()
+
+    def _select(self, sql, params):
+        cursor = self.connection.execute(
+            'SELECT id FROM data WHERE {} ORDER BY id'.format(sql), params
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def _expected(self, text):
+        tree = self.parser.compile(text)
+        ids = []
+        for row in self.rows:
+            self.parser.variables = dict(zip(('id', 'a', 'b', 'x'), row))
+            if self.parser.parse(tree):
+                ids.append(row[0])
+
+        return ids
+
+    def test_translate(self):
+        """
+        Test translating expressions into SQL conditions.
+        """
+
+        translator = expression.SQL_Translator(functions={'abs': 'ABS'})
+        expressions = [
+            'a > 2',
+            'a + b >= 7 and x < 2',
+            'not (a == b) or x == 0.0',
+            'a / b > 1',
+            '-a < -1',
+            '(a > b) + (x > 1) == 2',
+            'b if a > 2 else x',
+            'a',
+            'abs(a) > 2',
+            'a * 2 - b != 1',
+            'True',
+            'None'
+        ]
+        for text in expressions:
+            sql, params = translator.translate(self.parser.compile(text))
+            self.assertEqual(self._select(sql, params), self._expected(text),
+                             msg='{}: {}'.format(text, sql))
+
+        sql, params = translator.translate(self.parser.compile('a > 2.5'))
+        self.assertEqual(sql, '"a" > ?')
+        self.assertEqual(params, [2.5])
+
+    def test_null(self):
+        """
+        Test translating comparisons with `None`.
+        """
+
+        self.connection.execute('INSERT INTO data VALUES (6, NULL, 1, 1.0)')
+        translator = expression.SQL_Translator()
+        sql, params = translator.translate(self.parser.compile('a is None'))
+        self.assertEqual(sql, '"a" IS NULL')
+        self.assertEqual(params, [])
+        self.assertEqual(self._select(sql, params), [6])
+
+        sql, params = translator.translate(self.parser.compile('None != a'))
+        self.assertEqual(sql, '"a" IS NOT NULL')
+        self.assertEqual(self._select(sql, params), [1, 2, 3, 4, 5])
+
+    def test_columns_and_variables(self):
+        """
+        Test translating names using column and variable mappings.
+        """
+
+        translator = expression.SQL_Translator(columns={'y': '"b"'},
+                                               variables={'limit': 4})
+        text = 'y >= limit'
+        sql, params = translator.translate(self.parser.compile(text))
+        self.assertEqual(sql, '"b" >= ?')
+        self.assertEqual(params, [4])
+        self.assertEqual(self._select(sql, params), [1, 2, 4])
+
+        translator = expression.SQL_Translator(variables={'data': [1, 2]})
+        with self.assertRaises(expression.Expression_Error) as context:
+            translator.translate(self.parser.compile('a == data'))
+
+        self.assertEqual(context.exception.kind, 'ValueError')
+        self.assertEqual(context.exception.name, 'data')
+
+    def test_errors(self):
+        """
+        Test reporting parts that cannot be translated.
+        """
+
+        translator = expression.SQL_Translator()
+        errors = [
+            ('square(a) > 4', 'square'),
+            ('a % 2 == 1', 'Mod'),
+            ('a < b < x', None),
+            ('(a or b) + 1', 'BoolOp'),
+            ('a in b', 'In')
+        ]
+        for text, name in errors:
+            with self.assertRaises(expression.Expression_Error) as context:
+                translator.translate(self.parser.compile(text))
+
+            self.assertEqual(context.exception.kind, 'ValueError', msg=text)
+            self.assertEqual(context.exception.name, name, msg=text)
+
+        text = '(a > 0 and\n square(b) > 1)'
+        with self.assertRaises(expression.Expression_Error) as context:
+            translator.translate(self.parser.compile(text))
+
+        self.assertEqual(context.exception.lineno, 2)
+        self.assertEqual(context.exception.col_offset, 1)
+
+    def test_split(self):
+        """
+        Test splitting expressions into translated and residual parts.
+        """
+
+        translator = expression.SQL_Translator()
+        text = 'a > 0 and square(b) > 10 and x < 3 and a % 2 == 1'
+        sql, params, residual = translator.split(self.parser.compile(text))
+        self.assertEqual(sql, '("a" > ?) AND ("x" < ?)')
+        self.assertEqual(params, [0, 3])
+
+        ids = []
+        for row_id in self._select(sql, params):
+            self.parser.variables = dict(zip(('id', 'a', 'b', 'x'),
+                                             self.rows[row_id - 1]))
+            if self.parser.parse(residual):
+                ids.append(row_id)
+
+        self.assertEqual(ids, self._expected(text))
+
+        sql, params, residual = translator.split(self.parser.compile('a > 1'))
+        self.assertEqual(sql, '"a" > ?')
+        self.assertIsNone(residual)
+
+        tree = self.parser.compile('square(a) > 1')
+        sql, params, residual = translator.split(tree)
+        self.assertIsNone(sql)
+        self.assertEqual(params, [])
+        self.assertIs(residual, tree)
+
+        # Trees that are not validated leave untranslatable parts residual.
+        tree = ast.parse('f(1)(2) > 0 and a > 1')
+        sql, params, residual = translator.split(tree)
+        self.assertEqual(sql, '"a" > ?')
+        self.assertEqual(ast.dump(residual.body[0].value),
+                         ast.dump(tree.body[0].value.values[0]))